@@ -0,0 +1,238 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'HAS_NUMPY',
+    'match_points',
+    'points_on_segments',
+]
+
+####################################################################################################
+
+"""This module implements geometric queries on batches of points and segments.
+
+Points are given as sequences of ``(x, y)``, or as N×2 arrays, and the functions return the list of
+the matching pairs of indexes ``(i, j)`` sorted by *i* then *j*.  The predicates are the ones of
+:mod:`KiCadRW.geometry`, with the same tolerance:
+
+* :func:`match_points` is :meth:`Position.__eq__`,
+* :func:`points_on_segments` is :meth:`Vector.point_in_segment`.
+
+When NumPy is available, the queries are vectorised: the items are registered in the cells of a
+grid like :class:`SpatialHash` does, the (item, cell) pairs are sorted, and the cells of the
+points are looked up with a binary search.  The candidates are then checked at once.  Otherwise
+a pure Python implementation using :class:`SpatialHash` is used, it returns the same pairs.
+
+Integer coordinates, see :func:`KiCadRW.geometry.to_iu`, are computed exactly using 64-bit
+integers, which is enough for a sheet of a few metres.
+"""
+
+####################################################################################################
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+from .geometry import EPSILON, Position, SpatialHash, Vector
+
+####################################################################################################
+
+# The keys of the grid cells are packed in a 64-bit integer
+_MAX_NUMBER_OF_CELLS = 2**62
+
+####################################################################################################
+
+def match_points(points, targets, cell_size=SpatialHash.DEFAULT_CELL_SIZE, use_numpy=None):
+    """Return the pairs ``(i, j)`` such that ``points[i] == targets[j]``.
+
+    *cell_size* must be in the unit of the coordinates.  If *use_numpy* is false, the pure Python
+    implementation is used, it defaults to :data:`HAS_NUMPY`.
+    """
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+    if use_numpy:
+        pairs = _np_match_points(points, targets, cell_size)
+        if pairs is not None:
+            return pairs
+    return _py_match_points(points, targets, cell_size)
+
+####################################################################################################
+
+def points_on_segments(points, starts, ends, cell_size=SpatialHash.DEFAULT_CELL_SIZE, use_numpy=None):
+    """Return the pairs ``(i, j)`` such that ``points[i]`` lies on the segment ``starts[j]``,
+    ``ends[j]``.
+
+    *cell_size* and *use_numpy* are the same as for :func:`match_points`.
+    """
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+    if use_numpy:
+        pairs = _np_points_on_segments(points, starts, ends, cell_size)
+        if pairs is not None:
+            return pairs
+    return _py_points_on_segments(points, starts, ends, cell_size)
+
+####################################################################################################
+#
+# Pure Python implementation
+#
+
+def _positions(points):
+    return [Position(x, y) for x, y in points]
+
+def _py_match_points(points, targets, cell_size):
+    index = SpatialHash(cell_size)
+    targets = _positions(targets)
+    for j, target in enumerate(targets):
+        index.insert_point(j, target)
+    pairs = []
+    for i, point in enumerate(_positions(points)):
+        for j in sorted(index.query(point)):
+            if point == targets[j]:
+                pairs.append((i, j))
+    return pairs
+
+def _py_points_on_segments(points, starts, ends, cell_size):
+    index = SpatialHash(cell_size)
+    starts = _positions(starts)
+    ends = _positions(ends)
+    for j, (start, end) in enumerate(zip(starts, ends)):
+        index.insert_segment(j, start, end)
+    pairs = []
+    for i, point in enumerate(_positions(points)):
+        for j in sorted(index.query(point)):
+            if Vector.point_in_segment(starts[j], ends[j], point):
+                pairs.append((i, j))
+    return pairs
+
+####################################################################################################
+#
+# NumPy implementation
+#
+
+def _np_array(points):
+    """Return a N×2 array, integer coordinates are kept as integers"""
+    array = np.asarray(points)
+    if array.dtype.kind not in 'iu':
+        array = array.astype(np.float64)
+    else:
+        array = array.astype(np.int64)
+    return array.reshape(-1, 2)
+
+def _np_pairs(i, j):
+    order = np.lexsort((j, i))
+    return list(zip(i[order].tolist(), j[order].tolist()))
+
+def _np_grid_candidates(boxes, points, cell_size):
+    """Return the candidate pairs (point index, box index) for boxes given as x_min, y_min, x_max,
+    y_max columns, or None if the grid is too large.
+
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    if not len(boxes) or not len(points):
+        return empty, empty
+    # same cells as SpatialHash
+    i_min = np.floor(boxes[:, 0] / cell_size).astype(np.int64)
+    j_min = np.floor(boxes[:, 1] / cell_size).astype(np.int64)
+    i_max = np.floor(boxes[:, 2] / cell_size).astype(np.int64)
+    j_max = np.floor(boxes[:, 3] / cell_size).astype(np.int64)
+    i_origin = int(i_min.min())
+    j_origin = int(j_min.min())
+    width = int(j_max.max()) - j_origin + 1
+    height = int(i_max.max()) - i_origin + 1
+    if width * height >= _MAX_NUMBER_OF_CELLS:
+        return None
+
+    # enumerate the (box, cell) pairs
+    number_of_columns = j_max - j_min + 1
+    counts = (i_max - i_min + 1) * number_of_columns
+    box_indexes = np.repeat(np.arange(len(boxes)), counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    columns = number_of_columns[box_indexes]
+    cell_i = i_min[box_indexes] + offsets // columns
+    cell_j = j_min[box_indexes] + offsets % columns
+    keys = (cell_i - i_origin) * width + (cell_j - j_origin)
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    box_indexes = box_indexes[order]
+
+    # lookup the cell of each point
+    point_i = np.floor(points[:, 0] / cell_size).astype(np.int64) - i_origin
+    point_j = np.floor(points[:, 1] / cell_size).astype(np.int64) - j_origin
+    inside = (point_i >= 0) & (point_i < height) & (point_j >= 0) & (point_j < width)
+    point_indexes = np.nonzero(inside)[0]
+    point_keys = point_i[inside] * width + point_j[inside]
+    lower = np.searchsorted(keys, point_keys, side='left')
+    upper = np.searchsorted(keys, point_keys, side='right')
+    counts = upper - lower
+    candidates = np.repeat(point_indexes, counts)
+    offsets = np.arange(int(counts.sum())) - np.repeat(np.cumsum(counts) - counts, counts)
+    return candidates, box_indexes[np.repeat(lower, counts) + offsets]
+
+def _np_match_points(points, targets, cell_size):
+    points = _np_array(points)
+    targets = _np_array(targets)
+    boxes = np.hstack((targets - EPSILON, targets + EPSILON))
+    candidates = _np_grid_candidates(boxes, points, cell_size)
+    if candidates is None:
+        return None
+    i, j = candidates
+    delta = np.abs(points[i] - targets[j])
+    match = (delta[:, 0] < EPSILON) & (delta[:, 1] < EPSILON)
+    return _np_pairs(i[match], j[match])
+
+def _np_points_on_segments(points, starts, ends, cell_size):
+    points = _np_array(points)
+    starts = _np_array(starts)
+    ends = _np_array(ends)
+    u = ends - starts
+    # use the same operations as Vector.point_in_segment so as to get the same results
+    u_u = u[:, 0] * u[:, 0] + u[:, 1] * u[:, 1]
+    length = np.sqrt(u_u)
+    # a degenerated segment can match far points, see SpatialHash.insert_segment
+    degenerated = length < EPSILON
+    segment_indexes = np.nonzero(~degenerated)[0]
+    margin = EPSILON + EPSILON / length[segment_indexes]
+    _starts = starts[segment_indexes]
+    _ends = ends[segment_indexes]
+    boxes = np.column_stack((
+        np.minimum(_starts[:, 0], _ends[:, 0]) - margin,
+        np.minimum(_starts[:, 1], _ends[:, 1]) - margin,
+        np.maximum(_starts[:, 0], _ends[:, 0]) + margin,
+        np.maximum(_starts[:, 1], _ends[:, 1]) + margin,
+    ))
+    candidates = _np_grid_candidates(boxes, points, cell_size)
+    if candidates is None:
+        return None
+    i, j = candidates
+    j = segment_indexes[j]
+    degenerated_indexes = np.nonzero(degenerated)[0]
+    if len(degenerated_indexes):
+        i = np.concatenate((i, np.repeat(np.arange(len(points)), len(degenerated_indexes))))
+        j = np.concatenate((j, np.tile(degenerated_indexes, len(points))))
+    v = points[i] - starts[j]
+    u_j = u[j]
+    vectorial_product = u_j[:, 0] * v[:, 1] - u_j[:, 1] * v[:, 0]
+    scalar_product = u_j[:, 0] * v[:, 0] + u_j[:, 1] * v[:, 1]
+    match = (np.abs(vectorial_product) < EPSILON) & (0 <= scalar_product) & (scalar_product <= u_u[j])
+    return _np_pairs(i[match], j[match])
@@ -20,19 +20,40 @@
 
 __all__ = [
     'EuclidianMatrice',
+    'IU_PER_MM',
+    'PointIndex',
     'Position',
     'PositionAngle',
+    'SegmentIndex',
+    'SpatialHash',
     'Vector',
+    'to_iu',
+    'to_mm',
 ]
 
 ####################################################################################################
 
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
 import math
 
 ####################################################################################################
 
 EPSILON = 1e-4   # numerical tolerance to match coordinate
 
+# KiCad stores coordinates as integer nanometres
+IU_PER_MM = 1_000_000
+
+####################################################################################################
+
+def to_iu(value):
+    """Convert a coordinate in mm to integer internal units"""
+    return round(value * IU_PER_MM)
+
+def to_mm(value):
+    """Convert a coordinate in internal units to mm"""
+    return value / IU_PER_MM
+
 ####################################################################################################
 
 class EuclidianMatrice:
@@ -58,21 +79,23 @@ class EuclidianMatrice:
             return [[-1, 0],
                     [ 0, -1]]
         elif angle == 270:
-            # 90 and mirror y
-            return [[ 0, 1],
-                    [-1, 0]]
+            # 90 and mirror x and y
+            return [[0, -1],
+                    [1,  0]]
 
     ##############################################
 
+    # KiCad mirrors a symbol after the rotation, (mirror x) flips the y axis of the sheet
+
     @classmethod
     def x_mirror(cls, matrice):
-        return [[-matrice[0][0], -matrice[0][1]],
-                [ matrice[1][0],  matrice[1][1]]]
+        return [[ matrice[0][0],  matrice[0][1]],
+                [-matrice[1][0], -matrice[1][1]]]
 
     @classmethod
     def y_mirror(cls, matrice):
-        return [[ matrice[0][0],  matrice[0][1]],
-                [-matrice[1][0], -matrice[1][1]]]
+        return [[-matrice[0][0], -matrice[0][1]],
+                [ matrice[1][0],  matrice[1][1]]]
 
 ####################################################################################################
 
@@ -105,6 +128,13 @@ class Position:
         return (math.fabs(self._x - other.x) < EPSILON and
                 math.fabs(self._y - other.y) < EPSILON)
 
+    def __hash__(self):
+        # Float coordinates are compared with a tolerance, thus only integer coordinates, see
+        #  :func:`to_iu`, can be hashed consistently
+        if isinstance(self._x, int) and isinstance(self._y, int):
+            return hash((self._x, self._y))
+        raise TypeError(f"unhashable position with float coordinates {self}")
+
     ##############################################
 
     def __add__(self, other):
@@ -184,3 +214,238 @@ class PositionAngle(Position):
 
     def __str__(self):
         return super().__str__() + f" @{self._angle}"
+
+####################################################################################################
+
+class SpatialHash:
+
+    """Grid index to find the objects close to a point.
+
+    Objects are registered in the cells overlapped by their bounding box, thus a query returns
+    candidates which must be checked by an exact predicate.
+    """
+
+    DEFAULT_CELL_SIZE = 5.08   # mm, 4 times the KiCad 50 mil grid
+
+    ##############################################
+
+    def __init__(self, cell_size=DEFAULT_CELL_SIZE):
+        self._cell_size = cell_size
+        self._cells = defaultdict(list)
+        # objects which can match any point
+        self._everywhere = []
+
+    ##############################################
+
+    def _cell_range(self, x_min, y_min, x_max, y_max):
+        size = self._cell_size
+        i_min = math.floor(x_min / size)
+        i_max = math.floor(x_max / size)
+        j_min = math.floor(y_min / size)
+        j_max = math.floor(y_max / size)
+        for i in range(i_min, i_max + 1):
+            for j in range(j_min, j_max + 1):
+                yield (i, j)
+
+    ##############################################
+
+    def insert_box(self, obj, x_min, y_min, x_max, y_max):
+        for key in self._cell_range(x_min, y_min, x_max, y_max):
+            self._cells[key].append(obj)
+
+    def insert_point(self, obj, point, margin=EPSILON):
+        self.insert_box(obj, point.x - margin, point.y - margin, point.x + margin, point.y + margin)
+
+    def insert_segment(self, obj, start, end):
+        """Register a segment for :meth:`Vector.point_in_segment` queries"""
+        length = (end - start).length()
+        if length < EPSILON:
+            # a degenerated segment can match far points
+            self._everywhere.append(obj)
+            return
+        # point_in_segment tolerance is on the vectorial product, i.e. distance * length
+        margin = EPSILON + EPSILON / length
+        self.insert_box(
+            obj,
+            min(start.x, end.x) - margin,
+            min(start.y, end.y) - margin,
+            max(start.x, end.x) + margin,
+            max(start.y, end.y) + margin,
+        )
+
+    ##############################################
+
+    def query(self, point):
+        """Return the candidates for a point, without duplicate"""
+        size = self._cell_size
+        key = (math.floor(point.x / size), math.floor(point.y / size))
+        candidates = self._cells.get(key, ())
+        if self._everywhere:
+            candidates = list(candidates) + self._everywhere
+        # objects are not always hashable, e.g. positions
+        return list({id(_): _ for _ in candidates}.values())
+
+####################################################################################################
+
+class _Line:
+
+    """Segments lying on a horizontal or vertical line, indexed by their abscissa on the line.
+
+    The abscissas of the extremities split the line in elementary intervals, and each segment is
+    registered in the intervals it covers, thus a query is a binary search.  Overlapping collinear
+    wires are rare, thus the intervals hold few segments.
+    """
+
+    ##############################################
+
+    def __init__(self):
+        self._segments = []
+        # breakpoint i is slot 2*i, the interval between breakpoints i and i+1 is slot 2*i+1
+        self._breakpoints = None
+        self._slots = None
+
+    ##############################################
+
+    def insert(self, obj, lower, upper):
+        self._segments.append((obj, lower, upper))
+        self._breakpoints = None
+
+    ##############################################
+
+    def _build(self):
+        breakpoints = sorted({_ for obj, lower, upper in self._segments for _ in (lower, upper)})
+        ranks = {_: i for i, _ in enumerate(breakpoints)}
+        slots = [[] for _ in range(2 * len(breakpoints) - 1)]
+        for obj, lower, upper in self._segments:
+            for slot in range(2 * ranks[lower], 2 * ranks[upper] + 1):
+                slots[slot].append(obj)
+        self._breakpoints = breakpoints
+        self._slots = slots
+
+    ##############################################
+
+    def _slot(self, abscissa):
+        breakpoints = self._breakpoints
+        i = bisect_left(breakpoints, abscissa)
+        if i < len(breakpoints) and breakpoints[i] == abscissa:
+            return 2 * i
+        # -1 is before the first breakpoint and 2 * len(breakpoints) - 1 after the last one
+        return 2 * i - 1
+
+    ##############################################
+
+    def query(self, lower, upper, candidates):
+        """Add the segments which overlap the interval [*lower*, *upper*] to the *candidates*
+        dictionary.
+
+        """
+        if self._breakpoints is None:
+            self._build()
+        slots = self._slots
+        for slot in range(max(self._slot(lower), 0), min(self._slot(upper), len(slots) - 1) + 1):
+            for obj in slots[slot]:
+                candidates[id(obj)] = obj
+
+####################################################################################################
+
+class SegmentIndex:
+
+    """Index of segments to find the segments which contain a point, e.g. to find the wires passing
+    through a junction.
+
+    Most KiCad wires are horizontal or vertical, they are grouped by line and the lines are sorted,
+    thus a query is done in O(log n) using binary searches.  Other segments, and segments shorter
+    than a unit for which the tolerance of :meth:`Vector.point_in_segment` is larger, are
+    registered in a :class:`SpatialHash`.
+
+    It has the same interface than :class:`SpatialHash` for segments: a query returns candidates
+    which must be checked by :meth:`Vector.point_in_segment`.
+    """
+
+    ##############################################
+
+    def __init__(self, cell_size=SpatialHash.DEFAULT_CELL_SIZE):
+        # ordinate -> line, for horizontal segments, and abscissa -> line for vertical ones
+        self._rows = {}
+        self._columns = {}
+        # sorted keys of the lines, None if they must be updated
+        self._row_keys = None
+        self._column_keys = None
+        self._others = SpatialHash(cell_size)
+        self._number_of_others = 0
+
+    ##############################################
+
+    def insert_segment(self, obj, start, end):
+        """Register a segment for :meth:`Vector.point_in_segment` queries"""
+        # the tolerance on the distance to the line is EPSILON / length, see insert_segment of
+        # SpatialHash, thus the line search is only valid for segments longer than one unit
+        if start.y == end.y and math.fabs(end.x - start.x) >= 1:
+            line = self._rows.get(start.y)
+            if line is None:
+                line = self._rows[start.y] = _Line()
+                self._row_keys = None
+            line.insert(obj, min(start.x, end.x), max(start.x, end.x))
+        elif start.x == end.x and math.fabs(end.y - start.y) >= 1:
+            line = self._columns.get(start.x)
+            if line is None:
+                line = self._columns[start.x] = _Line()
+                self._column_keys = None
+            line.insert(obj, min(start.y, end.y), max(start.y, end.y))
+        else:
+            self._others.insert_segment(obj, start, end)
+            self._number_of_others += 1
+
+    ##############################################
+
+    @staticmethod
+    def _query_lines(lines, keys, ordinate, abscissa, candidates):
+        # lines at a distance less than EPSILON
+        lower = bisect_left(keys, ordinate - EPSILON)
+        upper = bisect_right(keys, ordinate + EPSILON)
+        # Vector.point_in_segment compares the projection without tolerance, thus the nearby
+        # abscissas are looked up to be robust to rounding
+        for key in keys[lower:upper]:
+            lines[key].query(abscissa - EPSILON, abscissa + EPSILON, candidates)
+
+    ##############################################
+
+    def query(self, point):
+        """Return the candidates for a point, without duplicate"""
+        if self._row_keys is None:
+            self._row_keys = sorted(self._rows)
+        if self._column_keys is None:
+            self._column_keys = sorted(self._columns)
+        candidates = {}
+        self._query_lines(self._rows, self._row_keys, point.y, point.x, candidates)
+        self._query_lines(self._columns, self._column_keys, point.x, point.y, candidates)
+        if self._number_of_others:
+            for obj in self._others.query(point):
+                candidates[id(obj)] = obj
+        return list(candidates.values())
+
+####################################################################################################
+
+class PointIndex:
+
+    """Exact index of objects by position, it has the same interface than :class:`SpatialHash`
+    for points.
+
+    Positions must have integer coordinates, see :func:`to_iu`, so as to be hashable.
+    """
+
+    ##############################################
+
+    def __init__(self):
+        self._points = defaultdict(list)
+
+    ##############################################
+
+    def insert_point(self, obj, point):
+        self._points[point].append(obj)
+
+    ##############################################
+
+    def query(self, point):
+        """Return the objects at a point"""
+        return list(self._points.get(point, ()))
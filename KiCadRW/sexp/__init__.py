@@ -20,3 +20,4 @@
 
 from .patch import *
 from .SexpSymbols import *
+from .writer import FormattingPolicy, KiCadWriter, dump  # noqa: F401
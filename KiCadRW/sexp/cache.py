@@ -0,0 +1,293 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'ParseCache',
+]
+
+####################################################################################################
+
+"""This module implements an on-disk cache for parsed files.
+
+Entries are pickled objects stored in a cache directory.  They are keyed by a hash of the file
+content, the library version and a kind, e.g. ``sexpr`` for a parsed tree or ``KiCadSchema`` for an
+extracted schema model.  Thus an entry is never stale: a modified file or a new library version
+produce a new key.
+
+The cache has a size limit, the least recently used entries are evicted when it is exceeded.  The
+access time is tracked using the modification time of the entry file.
+
+The cache directory is scanned once, then a running size is updated by the writes.  The directory
+is only scanned again when a write exceeds the limit, the entries are then evicted down to a
+fraction of the limit.  Other processes can share the cache, thus the running size is an estimate
+which is corrected by each eviction.
+
+The cache can be inspected and purged from the command line::
+
+    python -m KiCadRW.sexp.cache info
+    python -m KiCadRW.sexp.cache list
+    python -m KiCadRW.sexp.cache purge
+
+"""
+
+####################################################################################################
+
+from pathlib import Path
+from typing import Any, Iterator
+import argparse
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+from KiCadRW import __version__
+from . import parser
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+class ParseCache:
+
+    _logger = _module_logger.getChild('ParseCache')
+
+    # Increment when the cached data structures change
+    FORMAT_VERSION = 4
+
+    DEFAULT_SIZE_LIMIT = 256 * 2**20   # bytes
+
+    # Fraction of the size limit kept when a write exceeds it, so as to not scan at each write
+    EVICTION_RATIO = 0.9
+
+    SUFFIX = '.pickle'
+
+    ##############################################
+
+    @classmethod
+    def default_path(cls) -> Path:
+        path = os.environ.get('KICADRW_CACHE')
+        if path:
+            return Path(path)
+        xdg_cache = os.environ.get('XDG_CACHE_HOME')
+        if xdg_cache:
+            return Path(xdg_cache, 'KiCadRW')
+        return Path.home().joinpath('.cache', 'KiCadRW')
+
+    ##############################################
+
+    def __init__(self, path: str = None, size_limit: int = None) -> None:
+        if path is None:
+            path = self.default_path()
+        self._path = Path(path)
+        if size_limit is None:
+            size_limit = self.DEFAULT_SIZE_LIMIT
+        self._size_limit = int(size_limit)
+        # running size of the entries, None if it is not known
+        self._size = None
+
+    ##############################################
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @property
+    def size_limit(self) -> int:
+        return self._size_limit
+
+    ##############################################
+
+    def key(self, content: bytes, kind: str) -> str:
+        """Return the key for a file content"""
+        _ = hashlib.sha256()
+        _.update(f'{kind}/{__version__}/{self.FORMAT_VERSION}/'.encode('ascii'))
+        _.update(content)
+        return _.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self._path.joinpath(key[:2], key + self.SUFFIX)
+
+    ##############################################
+
+    def get(self, key: str) -> Any:
+        """Return the cached object or None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as fh:
+                obj = pickle.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as exception:
+            self._logger.warning(f"Invalid cache entry {path}: {exception}")
+            self._remove(path)
+            return None
+        # track the access for the LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._logger.debug(f"Cache hit {key}")
+        return obj
+
+    ##############################################
+
+    def set(self, key: str, obj: Any) -> None:
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # write atomically, concurrent processes can share the cache
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fh:
+                pickle.dump(obj, fh, protocol=pickle.HIGHEST_PROTOCOL)
+                entry_size = fh.tell()
+            if self._size is None:
+                self._size = self.size
+            try:
+                # an entry is replaced
+                self._size -= path.stat().st_size
+            except FileNotFoundError:
+                pass
+            os.replace(tmp_path, path)
+        except BaseException:
+            self._remove(Path(tmp_path))
+            raise
+        self._logger.debug(f"Cache store {key}")
+        self._size += entry_size
+        if self._size > self._size_limit:
+            self.evict(int(self._size_limit * self.EVICTION_RATIO))
+
+    ##############################################
+
+    def load(self, path: str, backend: str = None, lazy: list = None) -> list:
+        """Parse a S-expression file using the cache"""
+        backend = backend or parser.get_default_backend()
+        if backend == 'index':
+            # a memory-mapped index cannot be pickled
+            return parser.load_path(path, backend)
+        with open(path, 'rb') as fh:
+            content = fh.read()
+        key = self.key(content, f'sexpr/{backend}/{sorted(lazy or ())}')
+        sexpr = self.get(key)
+        if sexpr is None:
+            sexpr = parser.loads(content.decode('utf8'), backend, lazy)
+            self.set(key, sexpr)
+        return sexpr
+
+    ##############################################
+
+    def entries(self) -> Iterator[tuple[Path, int, float]]:
+        """Yield (path, size, access time) for each entry"""
+        if not self._path.exists():
+            return
+        for path in self._path.glob('*/*' + self.SUFFIX):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_size, stat.st_mtime
+
+    @property
+    def size(self) -> int:
+        return sum(size for _, size, _ in self.entries())
+
+    ##############################################
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    ##############################################
+
+    def evict(self, size_limit: int = None) -> int:
+        """Remove the least recently used entries so as to fit in the size limit.
+
+        Return the number of removed entries.
+        """
+        if size_limit is None:
+            size_limit = self._size_limit
+        entries = sorted(self.entries(), key=lambda _: _[2])
+        size = sum(_[1] for _ in entries)
+        count = 0
+        for path, entry_size, _ in entries:
+            if size <= size_limit:
+                break
+            self._remove(path)
+            size -= entry_size
+            count += 1
+        self._size = size
+        if count:
+            self._logger.info(f"Evicted {count} cache entries")
+        return count
+
+    def purge(self) -> int:
+        """Remove all the entries"""
+        return self.evict(0)
+
+####################################################################################################
+
+def main() -> None:
+    argument_parser = argparse.ArgumentParser(description='Inspect and purge the KiCad-RW parse cache')
+    argument_parser.add_argument(
+        '--path',
+        default=None,
+        help=f'cache directory, default is {ParseCache.default_path()}',
+    )
+    argument_parser.add_argument(
+        '--size-limit',
+        type=int,
+        default=None,
+        help='size limit in MB',
+    )
+    argument_parser.add_argument(
+        'command',
+        choices=('info', 'list', 'purge', 'evict'),
+        default='info',
+        nargs='?',
+    )
+    args = argument_parser.parse_args()
+
+    size_limit = args.size_limit * 2**20 if args.size_limit is not None else None
+    cache = ParseCache(args.path, size_limit)
+    if args.command == 'info':
+        entries = list(cache.entries())
+        size = sum(_[1] for _ in entries)
+        print(f"Cache directory: {cache.path}")
+        print(f"Entries: {len(entries)}")
+        print(f"Size: {size / 2**20:.2f} MB / {cache.size_limit / 2**20:.2f} MB")
+    elif args.command == 'list':
+        for path, size, _ in sorted(cache.entries(), key=lambda _: _[2], reverse=True):
+            print(f"{path.stem}  {size / 1024:10.1f} kB")
+    elif args.command == 'purge':
+        count = cache.purge()
+        print(f"Removed {count} entries")
+    elif args.command == 'evict':
+        count = cache.evict()
+        print(f"Removed {count} entries")
+
+####################################################################################################
+
+if __name__ == '__main__':
+    main()
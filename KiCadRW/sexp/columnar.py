@@ -0,0 +1,619 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'ColumnarNode',
+    'ColumnarTree',
+]
+
+####################################################################################################
+
+"""This module implements a columnar representation of the tree built by
+:class:`KiCadRW.sexp.objectifier.Objectifier`.
+
+The elements of the tree, nodes and atoms, are numbered in depth first order and stored in five
+:class:`array.array` columns:
+
+* the tag id of a node, or -1 for an atom,
+* the index of the parent node,
+* the index of the first child and the index of the next sibling, or -1,
+* the id of an atom in the value table, or -1 for a node.
+
+Like for :class:`KiCadRW.sexp.objectifier.Node`, the car of a S-expression is the tag of the node
+and isn't an element.  The tags and the atoms are deduplicated in two tables, atoms are stored as
+their token text and are decoded on access.  Thus a tree only requires 20 bytes per element plus
+the tables, and hundreds of documents can be kept in memory.
+
+A :class:`ColumnarNode` is a light view on a node, which implements the same API than
+:class:`KiCadRW.sexp.objectifier.Node`::
+
+    tree = ColumnarTree.from_path('file.kicad_sch')
+    for node in tree.root.xpath('/kicad_sch/symbol/lib_id'):
+        print(node.childs)
+
+The nodes are indexed by tag when the tree is loaded, thus a path is selected in a time
+proportional to the number of nodes of the subtree having the last tag of the path.
+
+A tree is serialised to a single buffer using :meth:`ColumnarTree.to_bytes` and
+:meth:`ColumnarTree.save`, and is reloaded using :meth:`ColumnarTree.from_bytes` and
+:meth:`ColumnarTree.load`.
+
+"""
+
+####################################################################################################
+
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterator
+import logging
+import struct
+import sys
+
+from sexpdata import String, Symbol, car
+
+from .index import IndexedList, SexpIndex
+from .objectifier import PathMixin
+from .parser import LazySexpr, token_value
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+MAGIC = b'KRWC'
+VERSION = 1
+
+# magic, version, number of elements, number of tags, number of values, size of the tag and value blobs
+_HEADER = struct.Struct('<4sIIIIII')
+
+_LIST_TYPES = (list, IndexedList, LazySexpr)
+
+# The decoded atoms are not stored in the tree, but in a bounded cache shared by the trees, so as to
+# keep the memory usage flat: a tree repeats few distinct atoms, e.g. yes, hide, 1.27
+VALUE_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
+def _decode_token(token: bytes) -> Any:
+    """Return the atom of an encoded token"""
+    return token_value(token.decode('utf8'))
+
+####################################################################################################
+
+def _token(atom: Any) -> str:
+    """Return the token text of an atom"""
+    if isinstance(atom, Symbol):
+        return str(atom)
+    elif isinstance(atom, str):
+        return '"' + String.quote(atom) + '"'
+    elif isinstance(atom, (int, float)) and not isinstance(atom, bool):
+        return repr(atom)
+    raise ValueError(f"Unsupported atom {atom!r}")
+
+####################################################################################################
+
+class _Table:
+
+    """Table of deduplicated strings, stored as an UTF-8 blob and an array of offsets"""
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self._ids = {}
+        self._strings = []
+
+    ##############################################
+
+    def add(self, string: str) -> int:
+        _id = self._ids.get(string)
+        if _id is None:
+            _id = self._ids[string] = len(self._strings)
+            self._strings.append(string)
+        return _id
+
+    ##############################################
+
+    def pack(self) -> tuple[array, bytes]:
+        return _pack(self._strings)
+
+####################################################################################################
+
+def _pack(strings: list[str]) -> tuple[array, bytes]:
+    """Return the UTF-8 blob of *strings* and the offsets of each string in the blob"""
+    offsets = array('i', [0])
+    chunks = []
+    offset = 0
+    for string in strings:
+        chunk = string.encode('utf8')
+        chunks.append(chunk)
+        offset += len(chunk)
+        offsets.append(offset)
+    return offsets, b''.join(chunks)
+
+def _unpack(offsets: array, blob: bytes) -> list[str]:
+    return [blob[offsets[i]:offsets[i + 1]].decode('utf8') for i in range(len(offsets) - 1)]
+
+####################################################################################################
+
+class ColumnarTree:
+
+    """S-expression tree stored in flat arrays"""
+
+    _logger = _module_logger.getChild('ColumnarTree')
+
+    ##############################################
+
+    @classmethod
+    def from_sexpr(cls, sexpr: Any) -> 'ColumnarTree':
+        """Build a tree from a S-expression returned by :func:`KiCadRW.sexp.parser.loads`"""
+        tree = cls()
+        tags = _Table()
+        values = _Table()
+        if not isinstance(sexpr, _LIST_TYPES):
+            raise ValueError("Expected a S-expression")
+        # stack of (node index, iterator on the cdr, last child index)
+        stack = []
+
+        def add_node(sexpr: Any, parent: int) -> None:
+            _car = car(sexpr)
+            index = tree._append(tags.add(sys.intern(str(_car))), parent, -1)
+            iterator = iter(sexpr)
+            next(iterator)
+            stack.append([index, iterator, -1])
+        add_node(sexpr, -1)
+        firsts = tree._firsts
+        nexts = tree._nexts
+        while stack:
+            frame = stack[-1]
+            parent, iterator, last = frame
+            element = next(iterator, stack)
+            if element is stack:
+                stack.pop()
+                continue
+            index = len(tree)
+            if last == -1:
+                firsts[parent] = index
+            else:
+                nexts[last] = index
+            frame[2] = index
+            if isinstance(element, _LIST_TYPES):
+                add_node(element, parent)
+            else:
+                tree._append(-1, parent, values.add(_token(element)))
+        tree._set_tables(tags, values)
+        return tree
+
+    ##############################################
+
+    @classmethod
+    def from_index(cls, index: SexpIndex) -> 'ColumnarTree':
+        """Build a tree from a :class:`KiCadRW.sexp.index.SexpIndex`, the atoms are not decoded"""
+        tree = cls()
+        tags = _Table()
+        values = _Table()
+        firsts = tree._firsts
+        nexts = tree._nexts
+        # stack of (index item, parent node index)
+        stack = [(index.root._item, -1)]
+        lasts = {}
+        while stack:
+            item, parent = stack.pop()
+            i = len(tree)
+            if parent != -1:
+                last = lasts.get(parent, -1)
+                if last == -1:
+                    firsts[parent] = i
+                else:
+                    nexts[last] = i
+                lasts[parent] = i
+            if index.is_list(item):
+                childs = index.child_indexes(item)
+                if not childs:
+                    raise ValueError("Empty S-expression")
+                tag = str(index.value(childs[0]))
+                tree._append(tags.add(sys.intern(tag)), parent, -1)
+                for child in reversed(childs[1:]):
+                    stack.append((child, i))
+            else:
+                tree._append(-1, parent, values.add(index.raw(item).decode('utf8')))
+        tree._set_tables(tags, values)
+        return tree
+
+    ##############################################
+
+    @classmethod
+    def from_path(cls, path: str) -> 'ColumnarTree':
+        """Build the tree of a KiCad file"""
+        cls._logger.info(f"Load {path}")
+        with SexpIndex.from_path(path) as index:
+            return cls.from_index(index)
+
+    ##############################################
+
+    @classmethod
+    def from_bytes(cls, buffer: bytes) -> 'ColumnarTree':
+        """Load a tree serialised by :meth:`to_bytes`"""
+        buffer = memoryview(buffer)
+        if len(buffer) < _HEADER.size:
+            raise ValueError("Truncated buffer")
+        magic, version, number_of_elements, number_of_tags, number_of_values, tags_size, values_size = \
+            _HEADER.unpack_from(buffer)
+        if magic != MAGIC:
+            raise ValueError("Not a columnar tree")
+        if version != VERSION:
+            raise ValueError(f"Unsupported version {version}")
+        tree = cls()
+        offset = _HEADER.size
+
+        def read_array(size: int) -> array:
+            nonlocal offset
+            column = array('i')
+            end = offset + size * column.itemsize
+            if end > len(buffer):
+                raise ValueError("Truncated buffer")
+            column.frombytes(buffer[offset:end])
+            if sys.byteorder != 'little':
+                column.byteswap()
+            offset = end
+            return column
+        tree._tags = read_array(number_of_elements)
+        tree._parents = read_array(number_of_elements)
+        tree._firsts = read_array(number_of_elements)
+        tree._nexts = read_array(number_of_elements)
+        tree._values = read_array(number_of_elements)
+        tag_offsets = read_array(number_of_tags + 1)
+        tree._value_offsets = read_array(number_of_values + 1)
+        tags = bytes(buffer[offset:offset + tags_size])
+        offset += tags_size
+        tree._value_blob = bytes(buffer[offset:offset + values_size])
+        if len(tree._value_blob) != values_size:
+            raise ValueError("Truncated buffer")
+        tree._tag_names = [sys.intern(_) for _ in _unpack(tag_offsets, tags)]
+        tree._build_tag_index()
+        return tree
+
+    ##############################################
+
+    @classmethod
+    def load(cls, path: str) -> 'ColumnarTree':
+        """Load a tree saved by :meth:`save`"""
+        with open(Path(path), 'rb') as fh:
+            return cls.from_bytes(fh.read())
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self._tags = array('i')
+        self._parents = array('i')
+        self._firsts = array('i')
+        self._nexts = array('i')
+        self._values = array('i')
+        self._tag_names = []
+        self._tag_ids = {}
+        # node indexes by tag id
+        self._tag_nodes = []
+        self._value_offsets = array('i', [0])
+        self._value_blob = b''
+
+    ##############################################
+
+    def _append(self, tag: int, parent: int, value: int) -> int:
+        index = len(self._tags)
+        self._tags.append(tag)
+        self._parents.append(parent)
+        self._firsts.append(-1)
+        self._nexts.append(-1)
+        self._values.append(value)
+        return index
+
+    def _set_tables(self, tags: _Table, values: _Table) -> None:
+        self._tag_names = tags._strings
+        self._value_offsets, self._value_blob = values.pack()
+        self._build_tag_index()
+
+    def _build_tag_index(self) -> None:
+        """Index the nodes by tag, in document order"""
+        self._tag_ids = {name: i for i, name in enumerate(self._tag_names)}
+        tag_nodes = [array('i') for _ in self._tag_names]
+        for i, tag in enumerate(self._tags):
+            if tag != -1:
+                tag_nodes[tag].append(i)
+        self._tag_nodes = tag_nodes
+
+    ##############################################
+
+    def to_bytes(self) -> bytes:
+        """Serialise the tree to a single buffer"""
+        tag_offsets, tags = _pack(self._tag_names)
+        header = _HEADER.pack(
+            MAGIC, VERSION,
+            len(self), len(self._tag_names), len(self._value_offsets) - 1,
+            len(tags), len(self._value_blob),
+        )
+        chunks = [header]
+        for column in (
+                self._tags, self._parents, self._firsts, self._nexts, self._values,
+                tag_offsets, self._value_offsets,
+        ):
+            if sys.byteorder != 'little':
+                column = array(column.typecode, column)
+                column.byteswap()
+            chunks.append(column.tobytes())
+        chunks.append(tags)
+        chunks.append(self._value_blob)
+        return b''.join(chunks)
+
+    ##############################################
+
+    def save(self, path: str) -> None:
+        with open(Path(path), 'wb') as fh:
+            fh.write(self.to_bytes())
+
+    ##############################################
+
+    def __len__(self) -> int:
+        """Return the number of elements, nodes and atoms"""
+        return len(self._tags)
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self._tags) - self._tags.count(-1)
+
+    @property
+    def tag_names(self) -> list[str]:
+        return self._tag_names
+
+    @property
+    def root(self) -> 'ColumnarNode':
+        if not self._tags:
+            raise ValueError("Empty tree")
+        return ColumnarNode(self, 0)
+
+    ##############################################
+
+    def nodes_by_tag(self, tag: str) -> array:
+        """Return the indexes of the nodes having this tag, in document order"""
+        tag_id = self._tag_ids.get(tag)
+        if tag_id is None:
+            return array('i')
+        return self._tag_nodes[tag_id]
+
+    def subtree_end(self, index: int) -> int:
+        """Return the index following the last descendant of *index*"""
+        nexts = self._nexts
+        parents = self._parents
+        while index != -1:
+            next_index = nexts[index]
+            if next_index != -1:
+                return next_index
+            index = parents[index]
+        return len(self._tags)
+
+    ##############################################
+
+    def is_node(self, index: int) -> bool:
+        return self._tags[index] != -1
+
+    def tag(self, index: int) -> str:
+        return self._tag_names[self._tags[index]]
+
+    def parent_index(self, index: int) -> int:
+        return self._parents[index]
+
+    def child_indexes(self, index: int) -> list[int]:
+        nexts = self._nexts
+        indexes = []
+        child = self._firsts[index]
+        while child != -1:
+            indexes.append(child)
+            child = nexts[child]
+        return indexes
+
+    ##############################################
+
+    def value(self, index: int) -> Any:
+        """Return the decoded atom at *index*"""
+        value_id = self._values[index]
+        offsets = self._value_offsets
+        return _decode_token(self._value_blob[offsets[value_id]:offsets[value_id + 1]])
+
+    def element(self, index: int) -> Any:
+        """Return a :class:`ColumnarNode` or an atom"""
+        if self._tags[index] != -1:
+            return ColumnarNode(self, index)
+        return self.value(index)
+
+####################################################################################################
+
+class ColumnarNode(PathMixin):
+
+    """View on a node of a :class:`ColumnarTree`"""
+
+    __slots__ = ('_tree', '_index')
+
+    ##############################################
+
+    def __init__(self, tree: ColumnarTree, index: int) -> None:
+        self._tree = tree
+        self._index = index
+
+    ##############################################
+
+    @property
+    def tree(self) -> ColumnarTree:
+        return self._tree
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def name(self) -> str:
+        return self._tree.tag(self._index)
+
+    @property
+    def parent(self) -> 'ColumnarNode':
+        parent = self._tree._parents[self._index]
+        if parent == -1:
+            return None
+        return ColumnarNode(self._tree, parent)
+
+    ##############################################
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, ColumnarNode):
+            return self._tree is other._tree and self._index == other._index
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._tree), self._index))
+
+    ##############################################
+
+    @property
+    def childs(self) -> list:
+        element = self._tree.element
+        return [element(_) for _ in self._tree.child_indexes(self._index)]
+
+    @property
+    def first_child(self) -> Any:
+        child = self._tree._firsts[self._index]
+        if child == -1:
+            raise IndexError("Node has no child")
+        return self._tree.element(child)
+
+    def __len__(self) -> int:
+        return len(self._tree.child_indexes(self._index))
+
+    def __bool__(self) -> bool:
+        return self._tree._firsts[self._index] != -1
+
+    def __iter__(self) -> Iterator[Any]:
+        tree = self._tree
+        nexts = tree._nexts
+        child = tree._firsts[self._index]
+        while child != -1:
+            yield tree.element(child)
+            child = nexts[child]
+
+    ##############################################
+
+    def depth_first_search(self, on_node: Callable = None, on_leaf: Callable = None, on_leave: Callable = None) -> None:
+        """Visit the subtree, see :meth:`KiCadRW.sexp.objectifier.TreeMixin.depth_first_search`"""
+        if on_node and not on_node(self):
+            return
+        tree = self._tree
+        tags = tree._tags
+        firsts = tree._firsts
+        nexts = tree._nexts
+        # stack of [node, index of the next child]
+        stack = [[self, firsts[self._index]]]
+        while stack:
+            frame = stack[-1]
+            child = frame[1]
+            if child == -1:
+                stack.pop()
+                if on_leave:
+                    on_leave(frame[0])
+                continue
+            frame[1] = nexts[child]
+            if tags[child] != -1:
+                node = ColumnarNode(tree, child)
+                if on_node is None or on_node(node):
+                    stack.append([node, firsts[child]])
+            elif on_leaf:
+                on_leaf(tree.value(child))
+
+    ##############################################
+
+    def iter_nodes(self) -> Iterator['ColumnarNode']:
+        """Iterate over the node and its descendant nodes in document order"""
+        tree = self._tree
+        tags = tree._tags
+        for index in range(self._index, tree.subtree_end(self._index)):
+            if tags[index] != -1:
+                yield ColumnarNode(tree, index)
+
+    def iter_leaves(self) -> Iterator[Any]:
+        """Iterate over the atoms of the subtree in document order"""
+        tree = self._tree
+        tags = tree._tags
+        for index in range(self._index + 1, tree.subtree_end(self._index)):
+            if tags[index] == -1:
+                yield tree.value(index)
+
+    ##############################################
+
+    def _child(self, index: int) -> Any:
+        tree = self._tree
+        nexts = tree._nexts
+        child = tree._firsts[self._index]
+        while index and child != -1:
+            child = nexts[child]
+            index -= 1
+        if child == -1:
+            return None
+        return tree.element(child)
+
+    def _child_nodes(self, name: str) -> list:
+        tree = self._tree
+        tag_id = tree._tag_ids.get(name)
+        if tag_id is None:
+            return []
+        tags = tree._tags
+        nexts = tree._nexts
+        nodes = []
+        child = tree._firsts[self._index]
+        while child != -1:
+            if tags[child] == tag_id:
+                nodes.append(ColumnarNode(tree, child))
+            child = nexts[child]
+        return nodes
+
+    def _select(self, steps: tuple[str]) -> list:
+        # check the ancestors of the nodes of the subtree having the last tag
+        tree = self._tree
+        tag_ids = tree._tag_ids
+        parent_steps = []
+        for step in steps[-2::-1]:
+            tag_id = tag_ids.get(step)
+            if tag_id is None:
+                return []
+            parent_steps.append(tag_id)
+        candidates = tree.nodes_by_tag(steps[-1])
+        start = self._index
+        lower = bisect_left(candidates, start + 1)
+        upper = bisect_left(candidates, tree.subtree_end(start), lower)
+        tags = tree._tags
+        parents = tree._parents
+        results = []
+        for i in range(lower, upper):
+            index = candidates[i]
+            parent = parents[index]
+            for tag_id in parent_steps:
+                if parent == -1 or tags[parent] != tag_id:
+                    break
+                parent = parents[parent]
+            else:
+                if parent == start:
+                    results.append(ColumnarNode(tree, index))
+        return results
@@ -30,6 +30,10 @@ __all__ = [
 import sexpdata
 from sexpdata import car, cdr, Symbol
 
+from .. import parser
+from ..index import IndexedList
+from ..parser import LazySexpr
+
 ####################################################################################################
 
 def get_value(_):
@@ -55,8 +59,12 @@ class Sexpression:
             for item in cdr(sexpr):
                 if isinstance(item, sexpdata.Symbol):
                     d['_'].append(get_value(item))
-                elif isinstance(item, list):
-                    key, value = cls.to_dict(item)
+                elif isinstance(item, (list, IndexedList, LazySexpr)):
+                    if isinstance(item, LazySexpr) and not item.is_materialized:
+                        # don't parse a lazy S-expression, it is converted on demand
+                        key, value = str(item.tag), item
+                    else:
+                        key, value = cls.to_dict(item)
                     # some keys can appear more than one time...
                     while key in d:
                         key += '*'
@@ -114,7 +122,5 @@ class Sexpression:
     ##############################################
 
     @classmethod
-    def load(cls, path):
-        with open(path) as fh:
-            _ = sexpdata.load(fh)
-        return _
+    def load(cls, path, backend=None, lazy=None):
+        return parser.load_path(path, backend, lazy)
@@ -0,0 +1,331 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'Document',
+    'DocumentList',
+]
+
+####################################################################################################
+
+"""This module implements a lossless round-trip document model.
+
+A :class:`Document` keeps the source buffer and each S-expression is loaded as a
+:class:`DocumentList`, a list which records its byte span in the source.  A mutation of a list
+marks it and its ancestors as modified.
+
+When the document is written, the text of the unmodified subtrees is copied verbatim from the
+source.  Only the modified lists are rebuilt: their unmodified items and the original whitespace
+are copied, and new items are formatted using a :class:`KiCadRW.sexp.writer.KiCadWriter`.  Thus the output of an
+unmodified document is identical to the source, and an edit only changes the lines where it
+occurs::
+
+    document = Document.from_path(path)
+    for item in document.root:
+        if item[0] == Symbol('symbol'):
+            ...
+            item[1] = 'new value'
+    document.save(path)
+
+"""
+
+####################################################################################################
+
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from sexpdata import Symbol
+
+from .index import SexpIndex
+from .writer import KiCadWriter
+
+####################################################################################################
+
+class DocumentList(list):
+
+    """List loaded from a source document, which tracks its modifications"""
+
+    __slots__ = ('_span', '_parent', '_original', '_spans', '_modified')
+
+    ##############################################
+
+    def __init__(self, items: Iterable = (), span: tuple[int, int] = None, spans: list = None) -> None:
+        super().__init__(items)
+        self._span = span
+        self._parent = None
+        # items and their spans in the source
+        self._original = tuple(self)
+        self._spans = spans
+        self._modified = False
+        for _ in self:
+            if isinstance(_, DocumentList):
+                _._parent = self
+
+    ##############################################
+
+    @property
+    def span(self) -> tuple[int, int]:
+        return self._span
+
+    @property
+    def parent(self) -> 'DocumentList':
+        return self._parent
+
+    @property
+    def is_modified(self) -> bool:
+        """True if the list or one of its descendants was modified"""
+        return self._modified
+
+    ##############################################
+
+    def _touch(self) -> None:
+        node = self
+        while node is not None and not node._modified:
+            node._modified = True
+            node = node._parent
+        for _ in self:
+            if isinstance(_, DocumentList):
+                _._parent = self
+
+    ##############################################
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self._touch()
+
+    def __delitem__(self, key) -> None:
+        super().__delitem__(key)
+        self._touch()
+
+    def __iadd__(self, other: Iterable) -> 'DocumentList':
+        super().__iadd__(other)
+        self._touch()
+        return self
+
+    def __imul__(self, other: int) -> 'DocumentList':
+        super().__imul__(other)
+        self._touch()
+        return self
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        self._touch()
+
+    def extend(self, items: Iterable) -> None:
+        super().extend(items)
+        self._touch()
+
+    def insert(self, index: int, item: Any) -> None:
+        super().insert(index, item)
+        self._touch()
+
+    def pop(self, index: int = -1) -> Any:
+        item = super().pop(index)
+        self._touch()
+        return item
+
+    def remove(self, item: Any) -> None:
+        super().remove(item)
+        self._touch()
+
+    def clear(self) -> None:
+        super().clear()
+        self._touch()
+
+    def sort(self, **kwargs: dict) -> None:
+        super().sort(**kwargs)
+        self._touch()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._touch()
+
+####################################################################################################
+
+class Document:
+
+    """S-expression document which can be written back without loss"""
+
+    ##############################################
+
+    @classmethod
+    def from_path(cls, path: str, writer: KiCadWriter = None) -> 'Document':
+        with open(Path(path), 'rb') as fh:
+            return cls(fh.read(), writer)
+
+    ##############################################
+
+    def __init__(self, source: bytes, writer: KiCadWriter = None) -> None:
+        if isinstance(source, str):
+            source = source.encode('utf8')
+        self._source = source
+        self._writer = KiCadWriter() if writer is None else writer
+        index = SexpIndex(source)
+        self._root = self._build(index, index.root._item)
+
+    ##############################################
+
+    @classmethod
+    def _build(cls, index: SexpIndex, item: int) -> DocumentList:
+        items = []
+        spans = []
+        for child in index.child_indexes(item):
+            if index.is_list(child):
+                items.append(cls._build(index, child))
+            else:
+                items.append(index.value(child))
+            spans.append(index.span(child))
+        return DocumentList(items, index.span(item), spans)
+
+    ##############################################
+
+    @property
+    def source(self) -> bytes:
+        return self._source
+
+    @property
+    def writer(self) -> KiCadWriter:
+        return self._writer
+
+    @property
+    def root(self) -> DocumentList:
+        return self._root
+
+    @property
+    def is_modified(self) -> bool:
+        return self._root.is_modified
+
+    ##############################################
+
+    def _text(self, start: int, end: int) -> str:
+        return self._source[start:end].decode('utf8')
+
+    def _line_indent(self, position: int) -> str:
+        """Return the indentation of the line containing position"""
+        start = self._source.rfind(b'\n', 0, position) + 1
+        end = start
+        while self._source[end:end + 1] in (b' ', b'\t'):
+            end += 1
+        return self._text(start, end)
+
+    ##############################################
+
+    def _gap(self, node: DocumentList, index: int) -> str:
+        """Return the original whitespace before an item"""
+        spans = node._spans
+        position = spans[index - 1][1] if index else node._span[0] + 1
+        return self._text(position, spans[index][0])
+
+    ##############################################
+
+    def _write_new_item(self, item: Any, gap: str, write: Callable, car_stack: list, indent: str) -> None:
+        """Write a new item, *gap* is the whitespace at this place in the source or None"""
+        text = self._writer.dumps(item, car_stack, indent)
+        if text.startswith('\n'):
+            if gap is not None and '\n' in gap:
+                text = gap + text.lstrip('\n \t')
+        else:
+            text = (' ' if gap is None else gap) + text
+        write(text)
+
+    ##############################################
+
+    def _write_list(self, node: DocumentList, write: Callable, car_stack: list) -> None:
+        start, end = node._span
+        if not node._modified:
+            write(self._text(start, end))
+            return
+
+        write('(')
+        car = node[0] if node else None
+        if isinstance(car, Symbol):
+            car_stack.append(str(car))
+        indent = self._line_indent(start)
+        original = node._original
+        spans = node._spans
+        # Items can be moved, thus lists are found by identity
+        original_lists = {id(_): i for i, _ in enumerate(original) if isinstance(_, DocumentList)}
+        # consecutive unmodified items are copied at once
+        run_start = run_end = None
+
+        def flush():
+            if run_start is not None:
+                write(self._text(run_start, run_end))
+        for i, item in enumerate(node):
+            if isinstance(item, DocumentList):
+                j = original_lists.get(id(item))
+            elif i < len(original) and item is original[i]:
+                j = i
+            else:
+                j = None
+            if j is not None:
+                gap_start = spans[j - 1][1] if j else start + 1
+                if isinstance(item, DocumentList) and item._modified:
+                    flush()
+                    run_start = None
+                    write(self._text(gap_start, spans[j][0]))
+                    self._write_list(item, write, car_stack)
+                elif run_start is not None and run_end == gap_start:
+                    run_end = spans[j][1]
+                else:
+                    flush()
+                    run_start, run_end = gap_start, spans[j][1]
+                continue
+            flush()
+            run_start = None
+            if isinstance(item, DocumentList) and item._span is not None:
+                # moved from another list
+                write(' ')
+                self._write_list(item, write, car_stack)
+            else:
+                if i < len(original):
+                    gap = self._gap(node, i)
+                else:
+                    gap = '' if i == 0 else None
+                self._write_new_item(item, gap, write, car_stack, indent)
+        flush()
+        if isinstance(car, Symbol):
+            car_stack.pop()
+
+        # text after the last original item, i.e. the whitespace and the closing parenthesis
+        if spans:
+            write(self._text(spans[-1][1], end))
+        else:
+            write(self._text(start + 1, end))
+
+    ##############################################
+
+    def write(self, write: Callable[[str], Any]) -> None:
+        start, end = self._root._span
+        write(self._text(0, start))
+        self._write_list(self._root, write, [])
+        write(self._text(end, len(self._source)))
+
+    def dumps(self) -> str:
+        chunks = []
+        self.write(chunks.append)
+        return ''.join(chunks)
+
+    def dump(self, fh) -> None:
+        self.write(fh.write)
+
+    def save(self, path: str) -> None:
+        with open(Path(path), 'w', encoding='utf8', newline='') as fh:
+            self.dump(fh)
@@ -0,0 +1,223 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'Atom',
+    'Child',
+    'Children',
+    'Record',
+    'RecordType',
+    'atoms',
+    'first_atom',
+    'tag_of',
+    'yes_no',
+]
+
+####################################################################################################
+
+"""This module implements a table-driven extractor of typed records from S-expressions.
+
+A :class:`RecordType` describes the fields of a record and how they are extracted from an item:
+
+* :class:`Atom` is an atom of the item, e.g. the name of a ``(label "name" ...)``,
+* :class:`Child` is the first child having a tag, e.g. ``(at 1 2 0)``,
+* :class:`Children` is the list of the children having a tag, e.g. the pins of a symbol.
+
+The value of a child is converted by a function, e.g. :func:`atoms`, or by another record type::
+
+    PIN = RecordType('Pin', {'at': Child('at', atoms), 'number': Child('number', first_atom)})
+    SYMBOL = RecordType('Symbol', {'name': Atom(0), 'pins': Children('pin', PIN)})
+    record = SYMBOL.extract(sexpr)
+    for pin in record.pins:
+        print(pin.number, pin.at)
+
+The items are visited once and the children which are not described are skipped, thus the lazy
+S-expressions of :func:`KiCadRW.sexp.parser.loads` are not parsed.  Symbols are converted to
+:class:`str`.
+
+"""
+
+####################################################################################################
+
+from typing import Any, Callable, Union
+
+from sexpdata import Symbol
+
+from .index import IndexedList
+from .parser import LazySexpr
+
+####################################################################################################
+
+_LIST_TYPES = (list, IndexedList, LazySexpr)
+
+####################################################################################################
+
+def tag_of(sexpr: Any) -> str:
+    """Return the tag of a S-expression, a lazy S-expression is not parsed"""
+    if isinstance(sexpr, LazySexpr):
+        return str(sexpr.tag)
+    return str(sexpr[0])
+
+def _atom(atom: Any) -> Any:
+    if isinstance(atom, Symbol):
+        return str(atom)
+    return atom
+
+def atoms(sexpr: Any) -> list:
+    """Return the atoms of the cdr, e.g. ``[x, y, angle]`` for ``(at x y angle)``"""
+    return [_atom(_) for _ in sexpr[1:] if not isinstance(_, _LIST_TYPES)]
+
+def first_atom(sexpr: Any) -> Any:
+    """Return the first atom of the cdr, e.g. the value of ``(unit 1)``"""
+    for _ in sexpr[1:]:
+        if not isinstance(_, _LIST_TYPES):
+            return _atom(_)
+    return None
+
+def yes_no(sexpr: Any) -> bool:
+    """Convert ``(in_bom yes)`` to a boolean"""
+    return first_atom(sexpr) == 'yes'
+
+####################################################################################################
+
+class Record:
+
+    """Base class of the records, the fields are the slots"""
+
+    __slots__ = ()
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{_}={getattr(self, _)!r}" for _ in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+####################################################################################################
+
+class Atom:
+
+    """Atom of the item at *index*, the car is not counted"""
+
+    ##############################################
+
+    def __init__(self, index: int, default: Any = None) -> None:
+        self.index = index
+        self.default = default
+
+####################################################################################################
+
+class Child:
+
+    """First child having this tag, converted by *converter*"""
+
+    ##############################################
+
+    def __init__(self, tag: str, converter: Union[Callable, 'RecordType'], default: Any = None) -> None:
+        self.tag = tag
+        self.converter = converter
+        self.default = default
+
+####################################################################################################
+
+class Children(Child):
+
+    """List of the children having this tag, converted by *converter*"""
+
+    ##############################################
+
+    def __init__(self, tag: str, converter: Union[Callable, 'RecordType']) -> None:
+        super().__init__(tag, converter)
+
+####################################################################################################
+
+class RecordType:
+
+    """Record type and the rules to extract its fields from an item"""
+
+    ##############################################
+
+    def __init__(self, name: str, fields: dict[str, Union[Atom, Child]]) -> None:
+        self._name = name
+        self._record_class = type(name, (Record,), {'__slots__': tuple(fields)})
+        self._defaults = []
+        self._lists = []
+        # atom index -> field name
+        self._atoms = {}
+        # tag -> (field name, converter, is list)
+        self._children = {}
+        for field, rule in fields.items():
+            if isinstance(rule, Atom):
+                self._atoms[rule.index] = field
+                self._defaults.append((field, rule.default))
+            elif isinstance(rule, (Child, Children)):
+                if rule.tag in self._children:
+                    raise NameError(f"Tag {rule.tag} is already used by {self._children[rule.tag][0]}")
+                converter = rule.converter
+                if isinstance(converter, RecordType):
+                    converter = converter.extract
+                is_list = isinstance(rule, Children)
+                self._children[rule.tag] = (field, converter, is_list)
+                if is_list:
+                    self._lists.append(field)
+                else:
+                    self._defaults.append((field, rule.default))
+            else:
+                raise ValueError(f"Invalid rule for field {field}")
+
+    ##############################################
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def record_class(self) -> type:
+        return self._record_class
+
+    ##############################################
+
+    def extract(self, sexpr: Any) -> Record:
+        """Extract a record from a S-expression"""
+        record = self._record_class()
+        for field, default in self._defaults:
+            setattr(record, field, default)
+        for field in self._lists:
+            setattr(record, field, [])
+        atom_fields = self._atoms
+        children = self._children
+        # fields already set by a child
+        found = set()
+        index = 0
+        for item in sexpr[1:]:
+            if isinstance(item, _LIST_TYPES):
+                rule = children.get(tag_of(item))
+                if rule is not None:
+                    field, converter, is_list = rule
+                    if is_list:
+                        getattr(record, field).append(converter(item))
+                    elif field not in found:
+                        setattr(record, field, converter(item))
+                        found.add(field)
+            else:
+                field = atom_fields.get(index)
+                if field is not None:
+                    setattr(record, field, _atom(item))
+                index += 1
+        return record
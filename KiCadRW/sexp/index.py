@@ -0,0 +1,261 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'IndexedList',
+    'SexpIndex',
+]
+
+####################################################################################################
+
+"""This module implements a memory-mapped offset index of a S-expression file.
+
+The file is memory mapped and scanned once.  For each element, S-expression or atom, we only record
+its start and end offsets in the file, the index of its first child and the index of its next
+sibling.  These are stored in four compact :class:`array.array`, thus no Python object is created
+for the elements.
+
+Atoms are decoded when they are accessed through :class:`IndexedList`, a read-only sequence which
+behaves like the lists returned by :func:`KiCadRW.sexp.parser.loads`.
+
+The file stays mapped until :meth:`SexpIndex.close` is called or the index is garbage collected.
+The index of an :class:`IndexedList` is given by :attr:`IndexedList.sexp_index`, e.g. to close the
+index returned by :func:`KiCadRW.sexp.parser.load_path`.
+
+"""
+
+####################################################################################################
+
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterator, Union
+import mmap
+
+from .parser import ParseError, token_value
+from .stream import _BYTES_TOKEN_RE
+
+####################################################################################################
+
+_OPENER = ord('(')
+_CLOSER = ord(')')
+_QUOTE = ord('"')
+
+# The decoded atoms are kept in a bounded cache shared by the indexes, so as to keep the memory
+# usage flat
+VALUE_CACHE_SIZE = 1024
+
+@lru_cache(maxsize=VALUE_CACHE_SIZE)
+def _decode_token(token: bytes) -> Any:
+    """Return the atom of an encoded token"""
+    return token_value(token.decode('utf8'))
+
+####################################################################################################
+
+class SexpIndex:
+
+    """Offset index of a S-expression buffer or file"""
+
+    ##############################################
+
+    @classmethod
+    def from_path(cls, path: str) -> 'SexpIndex':
+        with open(Path(path), 'rb') as fh:
+            buffer = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(buffer)
+
+    ##############################################
+
+    def __init__(self, buffer) -> None:
+        """*buffer* can be a bytes or a mmap"""
+        self._buffer = buffer
+        # use 32-bit offsets when possible
+        typecode = 'i' if len(buffer) < 2**31 else 'q'
+        self._starts = array(typecode)
+        self._ends = array(typecode)
+        self._firsts = array(typecode)
+        self._nexts = array(typecode)
+        self._roots = []
+        self._build()
+
+    ##############################################
+
+    def close(self) -> None:
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+    def __enter__(self) -> 'SexpIndex':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    ##############################################
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def root(self) -> 'IndexedList':
+        if len(self._roots) != 1:
+            raise ParseError(f"Expected one S-expression, got {len(self._roots)}")
+        return IndexedList(self, self._roots[0])
+
+    ##############################################
+
+    def _build(self) -> None:
+        buffer = self._buffer
+        starts = self._starts
+        ends = self._ends
+        firsts = self._firsts
+        nexts = self._nexts
+        roots = self._roots
+        # open S-expressions and their last child
+        stack = []
+        lasts = []
+        for match in _BYTES_TOKEN_RE.finditer(buffer):
+            start, end = match.span()
+            c = buffer[start]
+            if c == _CLOSER:
+                if not stack:
+                    raise ParseError("Too many closing parenthesis")
+                ends[stack.pop()] = end
+                lasts.pop()
+                continue
+            index = len(starts)
+            starts.append(start)
+            ends.append(end)
+            firsts.append(-1)
+            nexts.append(-1)
+            if stack:
+                last = lasts[-1]
+                if last == -1:
+                    firsts[stack[-1]] = index
+                else:
+                    nexts[last] = index
+                lasts[-1] = index
+            else:
+                roots.append(index)
+            if c == _OPENER:
+                stack.append(index)
+                lasts.append(-1)
+            elif c == _QUOTE and end - start == 1:
+                raise ParseError("Unterminated string")
+        if stack:
+            raise ParseError("Not enough closing parenthesis")
+
+    ##############################################
+
+    def span(self, index: int) -> tuple[int, int]:
+        return self._starts[index], self._ends[index]
+
+    def raw(self, index: int) -> bytes:
+        return self._buffer[self._starts[index]:self._ends[index]]
+
+    def is_list(self, index: int) -> bool:
+        return self._buffer[self._starts[index]] == _OPENER
+
+    ##############################################
+
+    def child_indexes(self, index: int) -> list[int]:
+        indexes = []
+        nexts = self._nexts
+        child = self._firsts[index]
+        while child != -1:
+            indexes.append(child)
+            child = nexts[child]
+        return indexes
+
+    ##############################################
+
+    def value(self, index: int) -> Any:
+        """Return the decoded atom or an :class:`IndexedList`"""
+        if self.is_list(index):
+            return IndexedList(self, index)
+        return _decode_token(self.raw(index))
+
+####################################################################################################
+
+class IndexedList:
+
+    """Read-only sequence view of a S-expression stored in a :class:`SexpIndex`"""
+
+    __slots__ = ('_index', '_item', '_childs')
+
+    ##############################################
+
+    def __init__(self, index: SexpIndex, item: int) -> None:
+        self._index = index
+        self._item = item
+        self._childs = None
+
+    ##############################################
+
+    @property
+    def sexp_index(self) -> SexpIndex:
+        return self._index
+
+    @property
+    def span(self) -> tuple[int, int]:
+        return self._index.span(self._item)
+
+    @property
+    def text(self) -> str:
+        return self._index.raw(self._item).decode('utf8')
+
+    ##############################################
+
+    def _child_indexes(self) -> list[int]:
+        if self._childs is None:
+            self._childs = self._index.child_indexes(self._item)
+        return self._childs
+
+    ##############################################
+
+    def __len__(self) -> int:
+        return len(self._child_indexes())
+
+    def __bool__(self) -> bool:
+        return self._index._firsts[self._item] != -1
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        value = self._index.value
+        if isinstance(key, slice):
+            return [value(_) for _ in self._child_indexes()[key]]
+        return value(self._child_indexes()[key])
+
+    def __iter__(self) -> Iterator[Any]:
+        value = self._index.value
+        for _ in self._child_indexes():
+            yield value(_)
+
+    ##############################################
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (list, IndexedList)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        return repr(list(self))
@@ -19,17 +19,28 @@
 ####################################################################################################
 
 __all__ = [
+    'Node',
     'Objectifier',
+    'PathMixin',
+    'Predicate',
+    'RootNode',
+    'XPath',
+    'compile_xpath',
 ]
 
 ####################################################################################################
 
+import functools
 import logging
 import re
-from typing import Any, Iterator
+import sys
+from typing import Any, Callable, Iterator
 
-import sexpdata
-from sexpdata import car, cdr, Symbol
+from sexpdata import car
+
+from . import parser
+from .index import IndexedList
+from .parser import LazySexpr, token_value
 
 ####################################################################################################
 
@@ -37,6 +48,29 @@ _module_logger = logging.getLogger(__name__)
 
 ####################################################################################################
 
+# note: Symbol is a str
+_ATOM_TYPES = (str, int, float)
+_LIST_TYPES = (list, IndexedList, LazySexpr)
+
+# Maximum number of compiled path expressions kept in cache
+XPATH_CACHE_SIZE = 256
+
+# A token of a path expression is a quoted string, an operator, a separator or a tag, an index or an atom
+_XPATH_TOKEN_RE = re.compile(r'\s*("(?:[^"\\]|\\.)*"|!=|\^=|\$=|\*=|=|[/\[\]]|[^\s/\[\]"=!^$*]+)\s*')
+
+# Predicate operators, equality is implemented by :meth:`Predicate._test_atom`
+_OPERATORS = {
+    '=': None,
+    '!=': None,
+    '^=': str.startswith,
+    '$=': str.endswith,
+    '*=': str.__contains__,
+}
+
+_XPATH_SPECIALS = frozenset(('/', '[', ']', *_OPERATORS))
+
+####################################################################################################
+
 def car_value(_):
     return car(_).value()
 
@@ -44,6 +78,8 @@ def car_value(_):
 
 class TreeMixin:
 
+    __slots__ = ('_childs',)
+
     ##############################################
 
     def __init__(self) -> None:
@@ -81,49 +117,412 @@ class TreeMixin:
     ##############################################
 
     def depth_first_search(self, on_node=None, on_leaf=None, on_leave=None) -> None:
-        go = True
-        if on_node:
-            go = on_node(self)
-        if go:
-            # print('-->')
-            for child in self:
+        """Visit the tree in depth first order.
+
+        *on_node* is called for each node and returns True to visit its childs, *on_leaf* is called
+        for each atom of a visited node and *on_leave* after the childs of a visited node.  The
+        traversal uses an explicit stack, thus the depth is not limited by the recursion limit.
+        """
+        if on_node and not on_node(self):
+            return
+        # the callbacks are tested outside of the loops, which are duplicated for this purpose
+        node_class = Node
+        _isinstance = isinstance
+        if on_leave is None:
+            # stack of iterators on the childs
+            stack = [iter(self._childs)]
+            push = stack.append
+            pop = stack.pop
+            if on_leaf is None:
+                while stack:
+                    for child in stack[-1]:
+                        if _isinstance(child, node_class) and (on_node is None or on_node(child)):
+                            push(iter(child._childs))
+                            break
+                    else:
+                        pop()
+            else:
+                while stack:
+                    for child in stack[-1]:
+                        if _isinstance(child, node_class):
+                            if on_node is None or on_node(child):
+                                push(iter(child._childs))
+                                break
+                        else:
+                            on_leaf(child)
+                    else:
+                        pop()
+        else:
+            # a node is pushed below the iterator on its childs
+            stack = [self, iter(self._childs)]
+            push = stack.append
+            pop = stack.pop
+            while stack:
+                for child in stack[-1]:
+                    if _isinstance(child, node_class):
+                        if on_node is None or on_node(child):
+                            push(child)
+                            push(iter(child._childs))
+                            break
+                    elif on_leaf:
+                        on_leaf(child)
+                else:
+                    pop()
+                    on_leave(pop())
+
+    ##############################################
+
+    def iter_nodes(self) -> Iterator['Node']:
+        """Iterate over the node and its descendant nodes in document order"""
+        yield self
+        stack = [iter(self._childs)]
+        while stack:
+            for child in stack[-1]:
+                if isinstance(child, Node):
+                    yield child
+                    stack.append(iter(child._childs))
+                    break
+            else:
+                stack.pop()
+
+    def iter_leaves(self) -> Iterator[Any]:
+        """Iterate over the atoms of the subtree in document order"""
+        stack = [iter(self._childs)]
+        while stack:
+            for child in stack[-1]:
                 if isinstance(child, Node):
-                    child.depth_first_search(on_node, on_leaf, on_leave)
-                elif on_leaf:
-                    on_leaf(child)
-            # print('<--')
-            if on_leave:
-                on_leave(self)
+                    stack.append(iter(child._childs))
+                    break
+                yield child
+            else:
+                stack.pop()
 
 ####################################################################################################
 
-class Node(TreeMixin):
+class Predicate:
+
+    """Predicate of a path step, e.g. ``[lib_id="Device:R"]``.
+
+    The operand is a relative path, an atom index or a relative path followed by an atom index,
+    the index defaults to 0 for a path.  A predicate without operator tests if the operand exists.
+    The operators are ``=``, ``!=``, ``^=`` (starts with), ``$=`` (ends with) and ``*=`` (contains).
+    Numbers are compared by value, other atoms by their string.
+    """
+
+    __slots__ = ('_path', '_index', '_operator', '_value', '_match')
 
     ##############################################
 
-    def __init__(self, path: str) -> None:
-        super().__init__()
+    def __init__(self, path: 'XPath' = None, index: int = None, operator: str = None, value: Any = None) -> None:
+        if operator is not None and operator not in _OPERATORS:
+            raise ValueError(f"Invalid operator {operator}")
         self._path = path
+        self._index = index
+        self._operator = operator
+        self._value = value
+        self._match = self._compile_match()
+
+    ##############################################
+
+    def _compile_match(self) -> Callable[[Any], bool]:
+        """Return a function which compares an atom to the value"""
+        operator = self._operator
+        if operator is None:
+            return None
+        value = self._value
+        if operator in ('=', '!='):
+            expected = operator == '='
+            if isinstance(value, (int, float)):
+                def match(atom: Any) -> bool:
+                    if isinstance(atom, (int, float)):
+                        return (atom == value) is expected
+                    return (str(atom) == str(value)) is expected
+                return match
+            value = str(value)
+            return lambda atom: (str(atom) == value) is expected
+        function = _OPERATORS[operator]
+        value = str(value)
+        return lambda atom: function(str(atom), value)
 
     ##############################################
 
     @property
-    def name(self) -> str:
-        return self._path[-1]
+    def path(self) -> 'XPath':
+        return self._path
+
+    @property
+    def index(self) -> int:
+        return self._index
+
+    @property
+    def operator(self) -> str:
+        return self._operator
+
+    @property
+    def value(self) -> Any:
+        return self._value
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        return f"Predicate({self._path!r}, {self._index}, {self._operator}, {self._value!r})"
+
+    ##############################################
+
+    def test(self, node: 'PathMixin') -> bool:
+        """Return True if *node* matches the predicate"""
+        if self._path is None:
+            nodes = (node,)
+        else:
+            nodes = self._path.select(node)
+        index = self._index
+        match = self._match
+        if index is None:
+            if match is None:
+                return bool(nodes)
+            index = 0
+        for node in nodes:
+            atom = node._child(index)
+            if atom is not None and not isinstance(atom, PathMixin):
+                if match is None or match(atom):
+                    return True
+        return False
+
+    ##############################################
+
+    def filter(self, nodes: list) -> list:
+        """Return the nodes matching the predicate"""
+        if self._path is None and self._match is not None:
+            # inline test on an atom of the nodes
+            index = self._index or 0
+            match = self._match
+            results = []
+            for node in nodes:
+                atom = node._child(index)
+                if atom is not None and not isinstance(atom, PathMixin) and match(atom):
+                    results.append(node)
+            return results
+        return [node for node in nodes if self.test(node)]
+
+####################################################################################################
+
+class XPath:
+
+    """Compiled path expression.
+
+    A path is a list of tags separated by ``/``, e.g. ``symbol/lib_id``.  A relative path matches the
+    descendants of the node, an absolute path starts with ``/`` and its first tag must match the node
+    itself, e.g. ``/kicad_sch/symbol/lib_id`` evaluated on the root.
+
+    The last step can be an index, it selects the atom at this index of each matched node, e.g.
+    ``symbol/property/1`` returns the values of the properties.  A tag made of digits must be
+    quoted, e.g. ``/kicad_pcb/layers/"0"`` for ``(layers (0 "F.Cu" signal) ...)``.
+
+    A step can be followed by :class:`Predicate` filters which must all match, e.g.
+    ``/kicad_sch/symbol[lib_id="Device:R"]``, ``symbol/property[0="Reference"][1^="U"]`` or
+    ``/kicad_sch/symbol[property[0="Reference"]/1^="U"]``.  Literals are quoted strings or bare
+    atoms.  Predicates are evaluated when the step is selected, thus the subtrees of the
+    non-matching nodes are not visited.
+    """
+
+    __slots__ = ('_path', '_absolute', '_steps', '_predicates', '_index')
+
+    ##############################################
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        try:
+            tokens = self._tokenize(path)
+            tokens.reverse()
+            self._absolute = bool(tokens) and tokens[-1] == '/'
+            if self._absolute:
+                tokens.pop()
+            self._steps, self._predicates, self._index = self._parse_steps(tokens)
+            if self._absolute and not self._steps:
+                raise ValueError("Expected a tag")
+            if tokens:
+                raise ValueError(f"Unexpected {tokens[-1]}")
+        except ValueError as exception:
+            raise ValueError(f"Invalid path expression {path!r}: {exception}") from None
+
+    ##############################################
+
+    @staticmethod
+    def _tokenize(path: str) -> list[str]:
+        tokens = []
+        position = 0
+        path = path.strip()
+        while position < len(path):
+            match = _XPATH_TOKEN_RE.match(path, position)
+            if match is None:
+                raise ValueError(f"Unexpected character at {position}")
+            tokens.append(match.group(1))
+            position = match.end()
+        return tokens
+
+    ##############################################
+
+    @classmethod
+    def _parse_steps(cls, tokens: list[str]) -> tuple[tuple, tuple, int]:
+        """Parse ``step ('/' step)* ['/' index]`` from the reversed *tokens*"""
+        steps = []
+        predicates = []
+        index = None
+        while True:
+            if not tokens or tokens[-1] in _XPATH_SPECIALS:
+                raise ValueError("Expected a tag")
+            name = tokens.pop()
+            if name[0] == '"':
+                # a quoted tag, e.g. the layer "0" of a PCB
+                name = str(token_value(name))
+            elif name.isdigit():
+                index = int(name)
+                break
+            step_predicates = []
+            while tokens and tokens[-1] == '[':
+                tokens.pop()
+                step_predicates.append(cls._parse_predicate(tokens))
+            steps.append(sys.intern(name))
+            predicates.append(tuple(step_predicates))
+            if tokens and tokens[-1] == '/':
+                tokens.pop()
+            else:
+                break
+        return tuple(steps), tuple(predicates), index
+
+    ##############################################
+
+    @classmethod
+    def _parse_predicate(cls, tokens: list[str]) -> Predicate:
+        """Parse ``operand [operator literal] ']'`` from the reversed *tokens*"""
+        steps, predicates, index = cls._parse_steps(tokens)
+        path = None
+        if steps:
+            path = XPath.__new__(XPath)
+            path._path = '/'.join(steps)
+            path._absolute = False
+            path._steps = steps
+            path._predicates = predicates
+            path._index = None
+        operator = value = None
+        if tokens and tokens[-1] in _OPERATORS:
+            operator = tokens.pop()
+            if not tokens or tokens[-1] in _XPATH_SPECIALS:
+                raise ValueError("Expected a literal")
+            value = token_value(tokens.pop())
+        if not tokens or tokens.pop() != ']':
+            raise ValueError("Expected ]")
+        return Predicate(path, index, operator, value)
+
+    ##############################################
 
     @property
     def path(self) -> str:
         return self._path
 
+    @property
+    def absolute(self) -> bool:
+        return self._absolute
+
+    @property
+    def steps(self) -> tuple[str]:
+        return self._steps
+
+    @property
+    def predicates(self) -> tuple[tuple[Predicate]]:
+        """Predicates of each step"""
+        return self._predicates
+
+    @property
+    def index(self) -> int:
+        """Index of the selected atoms, or None to select the nodes"""
+        return self._index
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        return f"XPath({self._path!r})"
+
+    ##############################################
+
+    def select(self, node: 'PathMixin') -> list:
+        """Return the nodes matching the path from *node*, or their atoms at the index, in document
+        order
+        """
+        nodes = self._select_nodes(node)
+        index = self._index
+        if index is None:
+            return nodes
+        atoms = []
+        for node in nodes:
+            atom = node._child(index)
+            if atom is not None and not isinstance(atom, PathMixin):
+                atoms.append(atom)
+        return atoms
+
+    def _select_nodes(self, node: 'PathMixin') -> list:
+        steps = self._steps
+        predicates = self._predicates
+        if self._absolute:
+            if node.name != steps[0]:
+                return []
+            for predicate in predicates[0]:
+                if not predicate.test(node):
+                    return []
+            steps = steps[1:]
+            predicates = predicates[1:]
+        if not steps:
+            return [node]
+        # the steps up to the first predicate are selected at once, using the tag index if any
+        for i, step_predicates in enumerate(predicates):
+            if step_predicates:
+                break
+        nodes = node._select(steps[:i + 1])
+        for j in range(i, len(steps)):
+            if j > i:
+                nodes = [child for node in nodes for child in node._child_nodes(steps[j])]
+            for predicate in predicates[j]:
+                nodes = predicate.filter(nodes)
+        return nodes
+
+####################################################################################################
+
+@functools.lru_cache(maxsize=XPATH_CACHE_SIZE)
+def compile_xpath(path: str) -> XPath:
+    """Return the compiled path expression, compiled expressions are cached"""
+    return XPath(path)
+
+####################################################################################################
+
+class PathMixin:
+
+    """Path and query methods of a node, the node must implement :attr:`name`, :attr:`parent` and
+    :meth:`depth_first_search`.
+    """
+
+    __slots__ = ()
+
+    ##############################################
+
+    @property
+    def path(self) -> list[str]:
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.name)
+            node = node.parent
+        path.reverse()
+        return path
+
     @property
     def path_str(self) -> str:
-        return '/'.join(self._path)
+        return '/'.join(self.path)
 
     @property
     def parent_str(self) -> str:
-        _ = self._path[:-1]
-        if _:
-            return '/'.join(_)
+        parent = self.parent
+        if parent is not None:
+            return parent.path_str
         return '/'
 
     ##############################################
@@ -136,73 +535,150 @@ class Node(TreeMixin):
 
     ##############################################
 
-    def xpath(self, path: str):
+    def xpath(self, path: str) -> list:
+        """Return the nodes matching the path expression, see :class:`XPath`"""
+        return compile_xpath(path).select(self)
 
-        DEBUG = False
+    ##############################################
 
-        if path.startswith('/'):
-            path = path[1:]
-            index = 0
-        else:
-            # relative
-            index = -1
-        parts = path.split('/')
-        last_index = len(parts) -1
-        if DEBUG:
-            print(parts, last_index)
+    def _child(self, index: int) -> Any:
+        """Return the child at *index* or None"""
+        for i, child in enumerate(self):
+            if i == index:
+                return child
+        return None
+
+    def _child_nodes(self, name: str) -> list:
+        """Return the child nodes having this tag"""
+        return [child for child in self if isinstance(child, PathMixin) and child.name == name]
+
+    def _select(self, steps: tuple[str]) -> list:
+        """Return the descendants matching the relative path *steps*"""
+        if len(steps) == 1:
+            return self._child_nodes(steps[0])
+        nodes = [self]
+        for step in steps:
+            nodes = [child for node in nodes for child in node._child_nodes(step)]
+        return nodes
 
-        results = []
+####################################################################################################
 
-        def on_node(node):
-            nonlocal index
-            if index == -1:
-                index = 0
-                return True
-            if DEBUG:
-                indent = '    '*index
-                print(indent, '@', index+1, node.path_str)
-            if node.name == parts[index]:
-                if DEBUG:
-                    print(indent, '  match')
-                if index == last_index:
-                    if DEBUG:
-                        print(indent, '  found')
+class Node(TreeMixin, PathMixin):
+
+    """Node of the S-expression tree.
+
+    A node only stores its tag, its parent and its childs, the path is computed from the parents.
+    The tags are interned, thus they are shared by all the nodes.
+    """
+
+    __slots__ = ('_name', '_parent')
+
+    ##############################################
+
+    def __init__(self, name: str, parent: 'Node' = None) -> None:
+        self._childs = []
+        self._name = sys.intern(name)
+        self._parent = parent
+
+    ##############################################
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def parent(self) -> 'Node':
+        return self._parent
+
+    ##############################################
+
+    def _child(self, index: int) -> Any:
+        childs = self._childs
+        if index < len(childs):
+            return childs[index]
+        return None
+
+    def _child_nodes(self, name: str) -> list:
+        return [child for child in self._childs if isinstance(child, Node) and child._name == name]
+
+####################################################################################################
+
+class RootNode(Node):
+
+    """Root node of a tree, which indexes the nodes by tag.
+
+    The index is built at load time by :meth:`build_tag_index`, thus a path is selected from the
+    root in a time proportional to the number of nodes having the last tag of the path.  It must be
+    rebuilt if the tree is modified.
+    """
+
+    __slots__ = ('_tag_index',)
+
+    ##############################################
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+        self._tag_index = None
+
+    ##############################################
+
+    @property
+    def tag_index(self) -> dict[str, list[Node]]:
+        return self._tag_index
+
+    ##############################################
+
+    def build_tag_index(self) -> None:
+        """Index the descendants by tag, in document order"""
+        tag_index = {}
+        nodes = self.iter_nodes()
+        next(nodes)
+        for node in nodes:
+            _nodes = tag_index.get(node._name)
+            if _nodes is None:
+                tag_index[node._name] = [node]
+            else:
+                _nodes.append(node)
+        self._tag_index = tag_index
+
+    ##############################################
+
+    def _select(self, steps: tuple[str]) -> list:
+        if self._tag_index is None:
+            return super()._select(steps)
+        # check the ancestors of the nodes having the last tag
+        parent_steps = steps[-2::-1]
+        results = []
+        for node in self._tag_index.get(steps[-1], ()):
+            parent = node._parent
+            for step in parent_steps:
+                if parent is None or parent._name != step:
+                    break
+                parent = parent._parent
+            else:
+                if parent is self:
                     results.append(node)
-                    return False
-                index += 1
-                return True
-            return False
-
-        def on_leave(node):
-            nonlocal index
-            if DEBUG:
-                indent = '    '*index
-                print(indent, '<<<@', index+1, 'leave')
-            index -= 1
-
-        self.depth_first_search(on_node, on_leave=on_leave)
         return results
 
 ####################################################################################################
 
 class SchemaNode(TreeMixin):
 
-    NODES = {}
-
     ##############################################
 
     @classmethod
-    def get_node(cls, node: None) -> 'SchemaNode':
-        if not cls.NODES:
+    def get_node(cls, nodes: dict, node: Node) -> 'SchemaNode':
+        """Return the schema node of *node* from the *nodes* path map, create it if required"""
+        if not nodes:
             # add root
-            cls.NODES['/'] = SchemaNode('/')
+            nodes['/'] = SchemaNode('/')
         path_str = node.path_str
-        if path_str in cls.NODES:
-            return cls.NODES[path_str]
+        if path_str in nodes:
+            return nodes[path_str]
         else:
             schema_node = SchemaNode(node.name)
-            cls.NODES[path_str] = schema_node
-            parent = cls.NODES[node.parent_str]
+            nodes[path_str] = schema_node
+            parent = nodes[node.parent_str]
             parent.append_child(schema_node)
             return schema_node
 
@@ -243,27 +719,35 @@ class Objectifier:
 
     ##############################################
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, backend: str = None) -> None:
         self._logger.info(f"Load {path}")
-        with open(path) as fh:
-            sexpr = sexpdata.load(fh)
+        sexpr = parser.load_path(path, backend)
         self._root = self._walk_sexpr(sexpr)
+        self._root.build_tag_index()
+        # schema nodes by path, see :meth:`get_schema`
+        self._schema_nodes = {}
 
     ##############################################
 
     @property
-    def root(self) -> Node:
+    def root(self) -> RootNode:
         return self._root
 
+    @property
+    def schema_nodes(self) -> dict[str, SchemaNode]:
+        return self._schema_nodes
+
     ##############################################
 
     def dump(self, root: Node = None) -> None:
         """Sump sexp structure"""
         if root is None:
             root = self._root
+
         def on_node(node):
             print(node.path_str)
             return True
+
         def on_leaf(leaf):
             print(f"    {leaf}")
         root.depth_first_search(on_node, on_leaf)
@@ -275,6 +759,7 @@ class Objectifier:
         if root is None:
             root = self._root
         paths = set()
+
         def on_node(node):
             paths.add(node.path_str)
             return True
@@ -284,38 +769,53 @@ class Objectifier:
 
     ##############################################
 
-    def get_schema(self, root: Node = None) -> None:
+    def get_schema(self, root: Node = None) -> dict[str, SchemaNode]:
+        """Learn the schema of the tree, return the schema nodes by path"""
         if root is None:
             root = self._root
+
         def on_node(node):
-            schema_node = SchemaNode.get_node(node)
+            schema_node = SchemaNode.get_node(self._schema_nodes, node)
             schema_node.link_instance(node)
             return True
+
         def on_leaf(leaf):
             pass
         root.depth_first_search(on_node, on_leaf)
+        return self._schema_nodes
 
     ##############################################
 
-    def _walk_sexpr(self, sexpr, path=[]):
-        """Perform a depth first search"""
-        if isinstance(sexpr, (str, int, float)):
+    def _walk_sexpr(self, sexpr, parent: Node = None):
+        """Build the tree in depth first order, using an explicit stack"""
+        if isinstance(sexpr, _ATOM_TYPES):
             return sexpr
-        elif isinstance(sexpr, Symbol):
-            return sexpr   # ??? .value()
-        elif isinstance(sexpr, list):
-            _car = car(sexpr)
-            if isinstance(_car, Symbol):
-                _car = str(_car)
-            else:
-                _car.value()
-            _cdr = cdr(sexpr)
-            path = path.copy()
-            path.append(_car)
-            node = Node(path)
-            for element in _cdr:
-                child = self._walk_sexpr(element, path)
-                node.append_child(child)
-            return node
-        else:
+        elif not isinstance(sexpr, _LIST_TYPES):
             raise ValueError()
+        items = iter(sexpr)
+        _car = str(next(items))
+        if parent is None:
+            root = RootNode(_car)
+        else:
+            root = Node(_car, parent)
+        # stack of (node, iterator on the cdr)
+        stack = [(root, items)]
+        push = stack.append
+        pop = stack.pop
+        while stack:
+            node, items = stack[-1]
+            childs = node._childs
+            for item in items:
+                if isinstance(item, _ATOM_TYPES):
+                    childs.append(item)
+                elif isinstance(item, _LIST_TYPES):
+                    child_items = iter(item)
+                    child = Node(str(next(child_items)), node)
+                    childs.append(child)
+                    push((child, child_items))
+                    break
+                else:
+                    raise ValueError()
+            else:
+                pop()
+        return root
@@ -0,0 +1,332 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'BACKENDS',
+    'LazySexpr',
+    'ParseError',
+    'get_default_backend',
+    'load',
+    'load_path',
+    'loads',
+    'set_default_backend',
+]
+
+####################################################################################################
+
+"""This module implements a S-expression parser dedicated to the KiCad file formats.
+
+sexpdata is a general Lisp reader which walks the text character by character.  KiCad only emits a
+small subset of the S-expression syntax: symbols, quoted strings with backslash escapes, integers
+and floats.  Thus we can tokenise the text using a single regular expression and build the nested
+lists in one pass using an explicit stack.
+
+The parser returns the same data structure than sexpdata: a list for each S-expression, a
+:class:`sexpdata.Symbol` for each bare atom which is not a number, a :class:`str` for quoted strings
+and :class:`int` or :class:`float` for numbers.  Unlike sexpdata, the symbols ``t`` and ``nil`` are
+not converted to :obj:`True` and an empty list since they have no special meaning for KiCad.
+
+The backend used by the loaders can be selected globally using :func:`set_default_backend` or per
+call using the *backend* parameter.  The *index* backend returns a lazy
+:class:`KiCadRW.sexp.index.IndexedList` built on a memory-mapped offset index, see
+:mod:`KiCadRW.sexp.index`.
+
+The *kicad* backend can skip the S-expressions whose car is listed in *lazy*, for example the
+graphic items of a symbol library which are useless to compute a netlist.  These subtrees are
+matched as a whole by the tokenizer, without building any object, and are replaced by a
+:class:`LazySexpr` which parses its text on first access.
+
+"""
+
+####################################################################################################
+
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Union
+import re
+
+import sexpdata
+from sexpdata import Symbol
+
+####################################################################################################
+
+BACKENDS = ('kicad', 'sexpdata', 'index')
+
+_default_backend = 'kicad'
+
+####################################################################################################
+
+class ParseError(ValueError):
+    pass
+
+####################################################################################################
+
+# A token is a parenthesis, a quoted string, a bare atom or an unterminated string
+_TOKEN_RE = re.compile(r'[()]|"(?:[^"\\]|\\.)*"|[^\s()"]+|"', re.DOTALL)
+
+# Text without parenthesis, quoted strings can contain parenthesis
+_CONTENT_PATTERN = r'[^()"]*(?:"(?:[^"\\]|\\.)*"[^()"]*)*'
+
+# Maximum depth of a lazy S-expression, deeper subtrees are parsed as usual
+LAZY_MAX_DEPTH = 6
+
+_LAZY_TAG_RE = re.compile(r'\(([^\s()"]+)')
+
+_ESCAPE_RE = re.compile(r'\\(.)', re.DOTALL)
+
+# same escapes than sexpdata.String
+_UNESCAPE = {
+    '\\': '\\',
+    '"': '"',
+    'b': '\b',
+    'f': '\f',
+    'n': '\n',
+    'r': '\r',
+    't': '\t',
+}
+
+_NUMBER_START = frozenset('0123456789+-.')
+
+####################################################################################################
+
+def _unescape_match(match: re.Match) -> str:
+    c = match.group(1)
+    return _UNESCAPE.get(c, '\\' + c)
+
+def unescape(string: str) -> str:
+    """Decode the backslash escapes of a quoted string"""
+    if '\\' in string:
+        return _ESCAPE_RE.sub(_unescape_match, string)
+    return string
+
+####################################################################################################
+
+def atom_value(token: str):
+    """Convert a bare atom to an int, a float or a Symbol"""
+    if token[0] in _NUMBER_START:
+        try:
+            return int(token)
+        except ValueError:
+            try:
+                return float(token)
+            except ValueError:
+                pass
+    return Symbol(token)
+
+def token_value(token: str):
+    """Convert a quoted string or a bare atom token"""
+    if token[0] == '"':
+        if token == '"':
+            raise ParseError("Unterminated string")
+        return unescape(token[1:-1])
+    return atom_value(token)
+
+####################################################################################################
+
+def _kicad_loads(text: str) -> list:
+    root = []
+    current = root
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    # Tokens are repeated a lot, e.g. "at", "effects", "1.27", thus we convert them once
+    #  and share the immutable value
+    values = {}
+    for token in _TOKEN_RE.findall(text):
+        if token == '(':
+            node = []
+            current.append(node)
+            push(current)
+            current = node
+        elif token == ')':
+            if not stack:
+                raise ParseError("Too many closing parenthesis")
+            current = pop()
+        else:
+            value = values.get(token)
+            if value is None:
+                value = values[token] = token_value(token)
+            current.append(value)
+    if stack:
+        raise ParseError("Not enough closing parenthesis")
+    if len(root) != 1:
+        raise ParseError(f"Expected one S-expression, got {len(root)}")
+    return root[0]
+
+@lru_cache(maxsize=32)
+def _lazy_token_re(lazy: frozenset) -> re.Pattern:
+    """Return a token regular expression matching lazy S-expressions as a whole"""
+    # Regular expressions cannot match nested parenthesis, thus we unroll the pattern up to a
+    #  maximum depth
+    balanced = _CONTENT_PATTERN
+    for _ in range(LAZY_MAX_DEPTH - 1):
+        balanced = rf'{_CONTENT_PATTERN}(?:\({balanced}\){_CONTENT_PATTERN})*'
+    tags = '|'.join(re.escape(_) for _ in sorted(lazy))
+    lazy_pattern = rf'\((?:{tags})(?=[\s()"]){balanced}\)'
+    return re.compile(f'{lazy_pattern}|{_TOKEN_RE.pattern}', re.DOTALL)
+
+def _kicad_loads_lazy(text: str, lazy: Iterable[str]) -> list:
+    root = []
+    current = root
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    values = {}
+    for token in _lazy_token_re(frozenset(str(_) for _ in lazy)).findall(text):
+        if token == '(':
+            node = []
+            current.append(node)
+            push(current)
+            current = node
+        elif token == ')':
+            if not stack:
+                raise ParseError("Too many closing parenthesis")
+            current = pop()
+        elif token[0] == '(':
+            # lazy S-expression
+            tag = token_value(_LAZY_TAG_RE.match(token).group(1))
+            current.append(LazySexpr(token, tag))
+        else:
+            value = values.get(token)
+            if value is None:
+                value = values[token] = token_value(token)
+            current.append(value)
+    if stack:
+        raise ParseError("Not enough closing parenthesis")
+    if len(root) != 1:
+        raise ParseError(f"Expected one S-expression, got {len(root)}")
+    return root[0]
+
+####################################################################################################
+
+class LazySexpr:
+
+    """S-expression which is parsed on first access.
+
+    The car is known without parsing using the :attr:`tag` attribute, else it behaves like a list.
+    """
+
+    __slots__ = ('_text', '_tag', '_sexpr')
+
+    ##############################################
+
+    def __init__(self, text: str, tag: Symbol) -> None:
+        self._text = text
+        self._tag = tag
+        self._sexpr = None
+
+    ##############################################
+
+    @property
+    def tag(self) -> Symbol:
+        return self._tag
+
+    @property
+    def text(self) -> str:
+        return self._text
+
+    @property
+    def is_materialized(self) -> bool:
+        return self._sexpr is not None
+
+    ##############################################
+
+    def materialize(self) -> list:
+        if self._sexpr is None:
+            self._sexpr = _kicad_loads(self._text)
+        return self._sexpr
+
+    ##############################################
+
+    def __len__(self) -> int:
+        return len(self.materialize())
+
+    def __bool__(self) -> bool:
+        return True
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        return self.materialize()[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.materialize())
+
+    ##############################################
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, LazySexpr):
+            other = other.materialize()
+        if isinstance(other, list):
+            return self.materialize() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    ##############################################
+
+    def __repr__(self) -> str:
+        if self._sexpr is None:
+            return f"LazySexpr({self._tag})"
+        return repr(self._sexpr)
+
+####################################################################################################
+
+def get_default_backend() -> str:
+    return _default_backend
+
+def set_default_backend(backend: str) -> None:
+    global _default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend}")
+    _default_backend = backend
+
+####################################################################################################
+
+def loads(text: str, backend: str = None, lazy: Iterable[str] = None) -> list:
+    """Parse a S-expression string
+
+    *lazy* is a list of tags to be loaded lazily, it is only honoured by the kicad backend.
+    """
+    if backend is None:
+        backend = _default_backend
+    if backend == 'kicad':
+        if lazy:
+            return _kicad_loads_lazy(text, lazy)
+        return _kicad_loads(text)
+    elif backend == 'sexpdata':
+        return sexpdata.loads(text)
+    elif backend == 'index':
+        from .index import SexpIndex
+        return SexpIndex(text.encode('utf8')).root
+    raise ValueError(f"Unknown parser backend {backend}")
+
+def load(fh, backend: str = None, lazy: Iterable[str] = None) -> list:
+    """Parse a S-expression from a text file object"""
+    return loads(fh.read(), backend, lazy)
+
+def load_path(path: str, backend: str = None, lazy: Iterable[str] = None) -> list:
+    """Parse a S-expression file
+
+    The index backend maps the file, it is unmapped when the tree is garbage collected or when
+    ``root.sexp_index.close()`` is called, see :class:`KiCadRW.sexp.index.SexpIndex`.
+    """
+    if (backend or _default_backend) == 'index':
+        from .index import SexpIndex
+        return SexpIndex.from_path(path).root
+    with open(path, encoding='utf8') as fh:
+        return load(fh, backend, lazy)
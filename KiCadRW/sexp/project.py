@@ -0,0 +1,374 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'KiCadProject',
+    'ProjectNet',
+]
+
+####################################################################################################
+
+"""This module implements a loader for hierarchical KiCad projects.
+
+The sheet hierarchy is discovered from the root schematic: each loaded sheet references its
+sub-sheets.  Sheets are parsed in parallel using a :class:`concurrent.futures.ProcessPoolExecutor`,
+as soon as their parent sheet is loaded.  Workers send back the :class:`KiCadSchema` model without
+the parsed tree, which is compact and picklable.
+
+A sheet file which is instantiated several times is only loaded once.
+
+The library symbols of the sheets built by the workers are replaced by the instances of the pool
+of the main process, see :class:`KiCadRW.sexp.schema.SymbolLibPool`, thus they are shared.
+
+The netlist of each sheet is computed in the main process once the sheets are loaded, since the
+connectivity graph is large to transfer between processes.  Each schema owns its netlist, thus
+the sheets don't interfere.
+
+The nets of the sheets are then merged to the nets of the project, see :class:`ProjectNet`: the
+nets having a global label or a power symbol with the same name are joined, and the nets of the
+hierarchical labels are joined to the nets of the pins of the parent sheet having the same name.
+A sheet file is only loaded once, but its nets are merged for each instance of the sheet.
+
+"""
+
+####################################################################################################
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import chain
+from pathlib import Path
+from typing import Iterator
+import logging
+
+from ..tools.disjoint_set import DisjointSet
+from .schema import KiCadSchema
+
+####################################################################################################
+
+_module_logger = logging.getLogger(__name__)
+
+####################################################################################################
+
+def _load_sheet(path: Path, backend: str, cache, integer_coordinates: bool) -> KiCadSchema:
+    # run in a worker process
+    return KiCadSchema(
+        path,
+        backend=backend,
+        cache=cache,
+        guess_netlist=False,
+        integer_coordinates=integer_coordinates,
+    )
+
+####################################################################################################
+
+class ProjectNet:
+
+    """A net of a project, i.e. a set of connected nets of the sheet instances.
+
+    The members are pairs ``(sheet path, net)``, since the nets of a sheet instantiated several
+    times belong to several nets of the project.
+    """
+
+    ##############################################
+
+    def __init__(self, id, members=()):
+        self._id = id
+        self._members = list(members)
+
+    ##############################################
+
+    @property
+    def id(self):
+        """Global label or power name, else a number"""
+        return self._id
+
+    @property
+    def members(self):
+        return iter(self._members)
+
+    @property
+    def sheet_paths(self):
+        return list(dict.fromkeys(_ for _, net in self._members))
+
+    @property
+    def nets(self):
+        return [net for _, net in self._members]
+
+    @property
+    def pins(self):
+        return [pin for _, net in self._members for pin in net.pins]
+
+    @property
+    def labels(self):
+        return [label for _, net in self._members for label in net.labels]
+
+    def __len__(self):
+        return len(self._members)
+
+    ##############################################
+
+    def __str__(self):
+        return f"#{self._id}"
+
+####################################################################################################
+
+class KiCadProject:
+
+    _logger = _module_logger.getChild('KiCadProject')
+
+    # Reference prefix of the power symbols, their value is a global net name, e.g. GND
+    POWER_REFERENCE_PREFIX = '#PWR'
+
+    ##############################################
+
+    @classmethod
+    def find_root_schema(cls, path: str) -> Path:
+        """Return the root schematic for a project file, a project directory or a schematic"""
+        path = Path(path)
+        if path.is_dir():
+            projects = list(path.glob('*.kicad_pro'))
+            if len(projects) != 1:
+                raise NameError(f"Cannot find the project file in {path}")
+            path = projects[0]
+        if path.suffix == '.kicad_pro':
+            path = path.with_suffix('.kicad_sch')
+        return path
+
+    ##############################################
+
+    def __init__(
+            self,
+            path: str,
+            max_workers: int = None,
+            backend: str = None,
+            cache=None,
+            integer_coordinates: bool = None,
+            guess_netlist: bool = False,
+    ) -> None:
+        """Load a KiCad project.
+
+        *path* can be a project file, a project directory or the root schematic.
+
+        *max_workers* is the number of processes, it defaults to the number of processors.  If it is
+        set to 1, sheets are loaded sequentially in the current process.
+
+        *backend*, *cache* and *integer_coordinates* are passed to :class:`KiCadSchema`.
+
+        If *guess_netlist* is true, the netlist of each sheet and the nets of the project are
+        computed, see :meth:`guess_netlist`.
+        """
+        self._root_path = self.find_root_schema(path).resolve()
+        self._schemas = {}
+        self._nets = []
+        options = (backend, cache, integer_coordinates)
+        if max_workers == 1:
+            self._load_sequential(options)
+        else:
+            self._load_parallel(max_workers, options)
+        if guess_netlist:
+            self.guess_netlist()
+
+    ##############################################
+
+    def _sub_sheet_paths(self, path: Path, schema: KiCadSchema) -> Iterator[Path]:
+        for sheet in schema.sheets:
+            yield path.parent.joinpath(sheet.file_name).resolve()
+
+    ##############################################
+
+    def _load_sequential(self, options: tuple) -> None:
+        pending = deque((self._root_path,))
+        while pending:
+            path = pending.popleft()
+            if path in self._schemas:
+                continue
+            self._logger.info(f"Load {path}")
+            schema = _load_sheet(path, *options)
+            self._schemas[path] = schema
+            pending.extend(self._sub_sheet_paths(path, schema))
+
+    ##############################################
+
+    def _load_parallel(self, max_workers: int, options: tuple) -> None:
+        schemas = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            # keep the discovery order
+            submitted = [self._root_path]
+            submitted_set = {self._root_path}
+            futures = {executor.submit(_load_sheet, self._root_path, *options): self._root_path}
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = futures.pop(future)
+                    schema = future.result()
+                    # share the library symbols with the other sheets
+                    schema.intern_symbol_libs()
+                    self._logger.info(f"Loaded {path}")
+                    schemas[path] = schema
+                    for sub_path in self._sub_sheet_paths(path, schema):
+                        if sub_path not in submitted_set:
+                            submitted.append(sub_path)
+                            submitted_set.add(sub_path)
+                            futures[executor.submit(_load_sheet, sub_path, *options)] = sub_path
+        self._schemas = {_: schemas[_] for _ in submitted}
+
+    ##############################################
+
+    @property
+    def root_path(self) -> Path:
+        return self._root_path
+
+    @property
+    def root(self) -> KiCadSchema:
+        return self._schemas[self._root_path]
+
+    @property
+    def paths(self) -> Iterator[Path]:
+        return iter(self._schemas.keys())
+
+    @property
+    def schemas(self) -> Iterator[KiCadSchema]:
+        return iter(self._schemas.values())
+
+    def __len__(self) -> int:
+        return len(self._schemas)
+
+    def __getitem__(self, path: str) -> KiCadSchema:
+        return self._schemas[Path(path).resolve()]
+
+    ##############################################
+
+    def guess_netlist(self) -> None:
+        """Compute the netlist of each sheet, then merge them to the nets of the project"""
+        for schema in self._schemas.values():
+            schema.guess_netlist()
+        self._merge_nets()
+
+    ##############################################
+
+    def _merge_nets(self) -> None:
+        """Join the nets of the sheet instances using a disjoint-set.
+
+        A sheet file can be instantiated several times, thus a net of the project is made of pairs
+        ``(sheet path, net)``, where the sheet path is built from the sheet names, e.g.
+        ``/Relays/Relay 1/``.
+        """
+
+        nets = DisjointSet()
+        # the disjoint-set uses the identity, thus a pair must be created once
+        pairs = {}
+        # net name -> first pair having this name
+        named_pairs = {}
+
+        def pair_of(sheet_path, net):
+            _ = (sheet_path, net)
+            return pairs.setdefault(_, _)
+
+        def join_name(name, pair):
+            if name:
+                nets.union(named_pairs.setdefault(name, pair), pair)
+
+        # Walk the sheet instances from the root, (sheet path, file path, parent sheet path, sheet)
+        pending = deque((('/', self._root_path, None, None),))
+        while pending:
+            sheet_path, path, parent_path, parent_sheet = pending.popleft()
+            schema = self._schemas[path]
+            # Add the nets first so as to number the nets in the sheet order
+            for net in schema.nets:
+                nets.add(pair_of(sheet_path, net))
+            for label in schema.global_labels:
+                if label.net_id is not None:
+                    join_name(label.name, pair_of(sheet_path, label.net_id))
+            for symbol in schema.symbols:
+                if symbol.reference.startswith(self.POWER_REFERENCE_PREFIX):
+                    for pin in symbol.pins:
+                        if pin.net_id is not None:
+                            join_name(symbol.value, pair_of(sheet_path, pin.net_id))
+            # Hierarchical labels are connected to the pins of the parent sheet having the same name
+            if parent_sheet is not None:
+                label_nets = {}
+                for label in schema.hierarchical_labels:
+                    if label.net_id is not None:
+                        label_nets.setdefault(label.name, []).append(label.net_id)
+                for pin in parent_sheet.pins:
+                    if pin.net_id is not None:
+                        for net in label_nets.get(pin.name, ()):
+                            nets.union(pair_of(parent_path, pin.net_id), pair_of(sheet_path, net))
+            for sheet, sub_path in zip(schema.sheets, self._sub_sheet_paths(path, schema)):
+                pending.append((f'{sheet_path}{sheet.name}/', sub_path, sheet_path, sheet))
+
+        names_by_root = {}
+        for name, pair in named_pairs.items():
+            names_by_root.setdefault(nets.find(pair), []).append(name)
+
+        self._nets = []
+        number = 0
+        for members in nets.groups():
+            names = names_by_root.get(nets.find(members[0]))
+            if names:
+                if len(names) > 1:
+                    self._logger.warning(f"Project net {names[0]} has several names: {' '.join(names)}")
+                id = names[0]
+            else:
+                number += 1
+                id = number
+            self._nets.append(ProjectNet(id, members))
+
+    ##############################################
+
+    def _chain(self, attribute: str) -> Iterator:
+        return chain.from_iterable(getattr(_, attribute) for _ in self._schemas.values())
+
+    @property
+    def symbols(self):
+        return self._chain('symbols')
+
+    @property
+    def wires(self):
+        return self._chain('wires')
+
+    @property
+    def buses(self):
+        return self._chain('buses')
+
+    @property
+    def junctions(self):
+        return self._chain('junctions')
+
+    @property
+    def labels(self):
+        return self._chain('labels')
+
+    @property
+    def global_labels(self):
+        return self._chain('global_labels')
+
+    @property
+    def hierarchical_labels(self):
+        return self._chain('hierarchical_labels')
+
+    @property
+    def sheets(self):
+        return self._chain('sheets')
+
+    @property
+    def nets(self) -> Iterator[ProjectNet]:
+        """Nets of the project, they are computed by :meth:`guess_netlist`"""
+        return iter(self._nets)
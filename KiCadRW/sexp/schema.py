@@ -20,6 +20,7 @@
 
 __all__ = [
     "KiCadSchema",
+    "SymbolLibPool",
 ]
 
 ####################################################################################################
@@ -56,12 +57,21 @@ Why the hell, KiCad don't use an XML file format and don't store the netlist !
 
 ####################################################################################################
 
+from collections import OrderedDict
+from itertools import chain
 import logging
+import threading
 
 # from pprint import pprint
 
-from ..geometry import EuclidianMatrice, Position, PositionAngle, Vector
+from .. import batch_geometry
+from ..geometry import (
+    EuclidianMatrice, PointIndex, Position, PositionAngle, SegmentIndex, SpatialHash, Vector,
+    to_iu, to_mm,
+)
+from ..tools.disjoint_set import DisjointSet
 from .deprecated.sexpression import Sexpression, cdr, car_value
+from .extractor import Atom, Child, Children, RecordType, atoms, first_atom, tag_of, yes_no
 
 ####################################################################################################
 
@@ -69,6 +79,50 @@ _module_logger = logging.getLogger(__name__)
 
 ####################################################################################################
 
+# Records extracted from the schematic items, see :mod:`KiCadRW.sexp.extractor`
+
+_AT = Child('at', atoms)
+
+POSITION_RECORD = RecordType('PositionRecord', {'at': _AT})
+
+POINTS_RECORD = RecordType('PointsRecord', {'xys': Children('xy', atoms)})
+SEGMENT_RECORD = RecordType('SegmentRecord', {'pts': Child('pts', POINTS_RECORD)})
+
+LABEL_RECORD = RecordType('LabelRecord', {'name': Atom(0), 'at': _AT})
+
+PROPERTY_RECORD = RecordType('PropertyRecord', {
+    'name': Atom(0),
+    'value': Atom(1),
+    'id': Child('id', first_atom),
+})
+
+LIB_PIN_RECORD = RecordType('LibPinRecord', {
+    'at': _AT,
+    'name': Child('name', first_atom),
+    'number': Child('number', first_atom),
+})
+LIB_UNIT_RECORD = RecordType('LibUnitRecord', {'name': Atom(0), 'pins': Children('pin', LIB_PIN_RECORD)})
+LIB_SYMBOL_RECORD = RecordType('LibSymbolRecord', {'name': Atom(0), 'units': Children('symbol', LIB_UNIT_RECORD)})
+
+SYMBOL_RECORD = RecordType('SymbolRecord', {
+    'lib_id': Child('lib_id', first_atom),
+    'at': _AT,
+    'mirror': Child('mirror', first_atom),
+    'unit': Child('unit', first_atom, 1),
+    'in_bom': Child('in_bom', yes_no, True),
+    'on_board': Child('on_board', yes_no, True),
+    'properties': Children('property', PROPERTY_RECORD),
+})
+
+SHEET_PIN_RECORD = RecordType('SheetPinRecord', {'name': Atom(0), 'at': _AT})
+SHEET_RECORD = RecordType('SheetRecord', {
+    'at': _AT,
+    'properties': Children('property', PROPERTY_RECORD),
+    'pins': Children('pin', SHEET_PIN_RECORD),
+})
+
+####################################################################################################
+
 def exchange_pair(_):
     return (_[1], _[0])
 
@@ -116,6 +170,7 @@ class OnWireMixin(Position):
     def __init__(self, x, y):
         super().__init__(x, y)
         self._wires = set()
+        self.net_id = None
 
     ##############################################
 
@@ -145,14 +200,13 @@ class Pin(NumberNameMixin, Position):
 
 ####################################################################################################
 
-class PinPosition(NumberNameMixin, Position):
+class PinPosition(NumberNameMixin, OnWireMixin):
 
     ##############################################
 
     def __init__(self, number, name, x, y):
-        Position.__init__(self, x, y)
+        OnWireMixin.__init__(self, x, y)
         NumberNameMixin.__init__(self, number, name)
-        self.net_id = None
 
     ##############################################
 
@@ -163,11 +217,25 @@ class PinPosition(NumberNameMixin, Position):
 
 class SymbolLib(NameMixin):
 
+    """A symbol of the library, it is shared by the symbols placed on the sheets.
+
+    A library symbol is frozen once it is added to a :class:`SymbolLibPool`, since the pooled
+    instances are shared by the sheets and are keyed by their pins.
+    """
+
+    # set by SymbolLibPool
+    _pooled = False
+
     ##############################################
 
-    def __init__(self, name):
+    def __init__(self, name, pins=()):
+        """*pins* is an iterable of ``(number, name, x, y)``"""
         NameMixin.__init__(self, name)
         self._pins = []
+        # (angle, mirror) -> [(pin, dx, dy), ...]
+        self._pin_offsets = {}
+        for _ in pins:
+            self.add_pin(*_)
 
     ##############################################
 
@@ -175,16 +243,160 @@ class SymbolLib(NameMixin):
     def pins(self):
         return iter(self._pins)
 
+    @property
+    def key(self):
+        """Content key of the library symbol, see :class:`SymbolLibPool`"""
+        return (self._name, tuple((_.number, _.name, _.x, _.y) for _ in self._pins))
+
+    ##############################################
+
+    @property
+    def pooled(self):
+        return self._pooled
+
     ##############################################
 
     def add_pin(self, number, name, x, y):
+        if self._pooled:
+            raise ValueError(f"Library symbol {self._name} is pooled and cannot be modified")
         pin = Pin(number, name, x, y)
         self._pins.append(pin)
+        self._pin_offsets.clear()
+
+    ##############################################
+
+    def pin_offsets(self, angle, mirror=None):
+        """Return the list of ``(pin, dx, dy)`` where *dx*, *dy* is the offset of the pin in the sheet
+        for a symbol placed with this orientation.
+
+        The offsets are computed once per orientation, thus placing a symbol is just an addition.
+        """
+        key = (angle, mirror)
+        offsets = self._pin_offsets.get(key)
+        if offsets is None:
+            matrice = EuclidianMatrice.rotation(angle)
+            if mirror == 'x':
+                matrice = EuclidianMatrice.x_mirror(matrice)
+            elif mirror == 'y':
+                matrice = EuclidianMatrice.y_mirror(matrice)
+            offsets = []
+            for pin in self._pins:
+                # the y axis of the library points up
+                v = Vector(pin.x, -pin.y) * matrice
+                offsets.append((pin, v.x, v.y))
+            self._pin_offsets[key] = offsets
+        return offsets
+
+####################################################################################################
+
+class SymbolLibPool:
+
+    """Intern pool of :class:`SymbolLib` instances, bounded using a LRU policy.
+
+    Each sheet embeds a copy of the library symbols it uses, thus the same definition is found in
+    many files.  The pool is keyed by the content of a library symbol, its name and pins, so
+    identical definitions are shared by every schematic, as well as their pins.  Pooled instances
+    are frozen, see :meth:`SymbolLib.add_pin`.
+
+    The pool is thread safe.
+    """
+
+    _logger = _module_logger.getChild("SymbolLibPool")
+
+    DEFAULT_MAX_SIZE = 4096
+
+    ##############################################
+
+    def __init__(self, max_size=None):
+        if max_size is None:
+            max_size = self.DEFAULT_MAX_SIZE
+        if max_size < 1:
+            raise ValueError(f"Invalid pool size {max_size}")
+        self._max_size = max_size
+        self._symbol_libs = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    ##############################################
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def hits(self):
+        return self._hits
+
+    @property
+    def misses(self):
+        return self._misses
+
+    def __len__(self):
+        return len(self._symbol_libs)
+
+    def __contains__(self, symbol_lib):
+        return self._symbol_libs.get(symbol_lib.key) is symbol_lib
+
+    ##############################################
+
+    def clear(self):
+        with self._lock:
+            self._symbol_libs.clear()
+            self._hits = 0
+            self._misses = 0
+
+    ##############################################
+
+    def _lookup(self, key):
+        with self._lock:
+            symbol_lib = self._symbol_libs.get(key)
+            if symbol_lib is None:
+                self._misses += 1
+            else:
+                self._symbol_libs.move_to_end(key)
+                self._hits += 1
+            return symbol_lib
+
+    def _add(self, key, symbol_lib):
+        with self._lock:
+            # another thread could have added it in the meantime
+            symbol_lib = self._symbol_libs.setdefault(key, symbol_lib)
+            symbol_lib._pooled = True
+            self._symbol_libs.move_to_end(key)
+            while len(self._symbol_libs) > self._max_size:
+                self._symbol_libs.popitem(last=False)
+            return symbol_lib
+
+    ##############################################
+
+    def get(self, name, pins):
+        """Return the library symbol having this name and pins, *pins* is a list of ``(number, name,
+        x, y)``.
+
+        """
+        key = (name, tuple(pins))
+        symbol_lib = self._lookup(key)
+        if symbol_lib is None:
+            symbol_lib = self._add(key, SymbolLib(name, key[1]))
+        return symbol_lib
+
+    ##############################################
+
+    def intern(self, symbol_lib):
+        """Return the pooled instance equal to *symbol_lib*, it is added if it is not found"""
+        key = symbol_lib.key
+        pooled = self._lookup(key)
+        if pooled is None:
+            pooled = self._add(key, symbol_lib)
+        return pooled
 
 ####################################################################################################
 
 class Symbol(PositionAngle):
 
+    _logger = _module_logger.getChild("Symbol")
+
     ##############################################
 
     def __init__(self, lib,
@@ -199,7 +411,7 @@ class Symbol(PositionAngle):
                  ):
         super().__init__(x, y, angle)
         self._lib = lib
-        self._mirror = None
+        self._mirror = mirror
         self._unit = unit
         self._in_bom = in_bom
         self._on_board = on_board
@@ -275,32 +487,28 @@ class Symbol(PositionAngle):
 
     ##############################################
 
-    def _pin_position(self, pin):
-        """Compute the pin position in the sheet"""
-        v = Vector(pin.x, -pin.y)
-
-        angle = self._angle
-        matrice = EuclidianMatrice.rotation(self._angle)
-        if self._mirror == 'x':
-            matrice = EuclidianMatrice.x_mirror(matrice)
-        elif self._mirror == 'y':
-            matrice = EuclidianMatrice.y_mirror(matrice)
-
-        p = v * matrice + self
-
-        return PinPosition(pin.number, pin.name, p.x, p.y)
+    def place_pins(self):
+        """Compute the pin positions in the sheet"""
+        x, y = self._x, self._y
+        self._pins = [
+            PinPosition(pin.number, pin.name, x + dx, y + dy)
+            for pin, dx, dy in self._lib.pin_offsets(self._angle, self._mirror)
+        ]
+        return self._pins
 
     ##############################################
 
-    def guess_netlist(self, wires):
-        for pin in self._lib.pins:
-            pin_position = self._pin_position(pin)
+    def connect_pins(self, wires, index=None):
+        """Compute the pin positions and connect the wires ending on a pin.
+
+        *index* is an optional :class:`SpatialHash` of the wire extremities.
+        """
+        for pin_position in self.place_pins():
+            if index is not None:
+                wires = index.query(pin_position)
             for wire in wires:
                 if wire.match_pin(pin_position):
-                    pin_position.net_id = wire.net_id
-            if pin_position.net_id is None:
-                self._logger.warning("Net not found")
-            self._pins.append(pin_position)
+                    pin_position.connect_wire(wire)
 
 ####################################################################################################
 
@@ -328,6 +536,10 @@ class Wire:
 
     ##############################################
 
+    @property
+    def id(self):
+        return self._id
+
     @property
     def start(self):
         return self._start
@@ -352,12 +564,7 @@ class Wire:
 
     @net_id.setter
     def net_id(self, value):
-        if self._net_id is None:
-            self._net_id = value
-            for _ in self._connections:
-                _.net_id = value
-        elif self._net_id != value:
-            raise NameError(f"net_id overwrite to {value} was {self._net_id}")
+        self._net_id = value
 
     ##############################################
 
@@ -495,35 +702,78 @@ class HierarchicalLabel(Label):
 
 ####################################################################################################
 
-class Sheet:
-    pass
+class SheetPin(NameMixin, OnWireMixin):
+
+    """A pin of a sheet, it is connected to the hierarchical label having the same name in the
+    sub-sheet.
+
+    """
+
+    ##############################################
+
+    def __init__(self, name, x, y):
+        OnWireMixin.__init__(self, x, y)
+        NameMixin.__init__(self, name)
+
+    ##############################################
+
+    def __str__(self):
+        return f"Sheet pin {self._name} " + super().__str__()
 
 ####################################################################################################
 
-class NetId:
+class Sheet(NameMixin, Position):
+
+    ##############################################
+
+    def __init__(self, name, file_name, x, y):
+        Position.__init__(self, x, y)
+        NameMixin.__init__(self, name)
+        self._file_name = file_name
+        self._pins = []
+
+    ##############################################
 
-    UUID = 0
-    NETS = []
-    MAP = {}
+    @property
+    def file_name(self):
+        return self._file_name
+
+    @property
+    def pins(self):
+        return iter(self._pins)
 
     ##############################################
 
-    @classmethod
-    def assign_ids(cls):
-        _id = 1
-        for net_id in cls.NETS:
-            if net_id._id is None:
-                net_id._id = _id
-                cls.MAP[_id] = net_id._uuid
-                _id += 1
+    def add_pin(self, name, x, y):
+        pin = SheetPin(name, x, y)
+        self._pins.append(pin)
+        return pin
 
     ##############################################
 
-    def __init__(self):
-        NetId.UUID += 1   # Fixme: Atomic
-        self._uuid = NetId.UUID
+    def __str__(self):
+        return f"Sheet {self._name} {self._file_name} " + super().__str__()
+
+####################################################################################################
+
+class Net:
+
+    """A set of connected wires, pins, labels and junctions"""
+
+    ##############################################
+
+    def __init__(self, uuid, members=()):
+        self._uuid = uuid
         self._id = None
-        NetId.NETS.append(self)
+        self._members = []
+        for _ in members:
+            self.add_member(_)
+
+    ##############################################
+
+    def add_member(self, obj):
+        self._members.append(obj)
+        obj.net_id = self
 
     ##############################################
 
@@ -531,19 +781,33 @@ class NetId:
     def uuid(self):
         return self._uuid
 
-    ##############################################
-
     @property
     def id(self):
+        """Net name or number, it is assigned by :class:`Netlist`"""
         return self._id
 
-    @id.setter
-    def id(self, value):
-        if value not in NetId.MAP:
-            self._id = value
-            NetId.MAP[value] = self._uuid
-        else:
-            raise NameError("Id is already assigned")
+    @property
+    def members(self):
+        return iter(self._members)
+
+    @property
+    def wires(self):
+        return [_ for _ in self._members if isinstance(_, Wire)]
+
+    @property
+    def pins(self):
+        return [_ for _ in self._members if isinstance(_, PinPosition)]
+
+    @property
+    def labels(self):
+        return [_ for _ in self._members if isinstance(_, Label)]
+
+    @property
+    def junctions(self):
+        return [_ for _ in self._members if isinstance(_, Junction)]
+
+    def __len__(self):
+        return len(self._members)
 
     ##############################################
 
@@ -555,15 +819,141 @@ class NetId:
 
 ####################################################################################################
 
+class Netlist:
+
+    """The nets of a schematic and their ids.
+
+    Each :class:`KiCadSchema` owns its netlist, thus schematics can be processed concurrently.
+    """
+
+    ##############################################
+
+    def __init__(self):
+        self._nets = []
+        self._ids = {}
+
+    ##############################################
+
+    def __len__(self):
+        return len(self._nets)
+
+    def __iter__(self):
+        return iter(self._nets)
+
+    def __getitem__(self, id):
+        """Return the net having this id"""
+        return self._ids[id]
+
+    def __contains__(self, id):
+        return id in self._ids
+
+    ##############################################
+
+    def new_net(self, members=()):
+        net = Net(len(self._nets) + 1, members)
+        self._nets.append(net)
+        return net
+
+    ##############################################
+
+    def assign_id(self, net, id):
+        if id in self._ids:
+            raise NameError(f"Id {id} is already assigned")
+        if net._id is not None:
+            del self._ids[net._id]
+        net._id = id
+        self._ids[id] = net
+
+    ##############################################
+
+    def assign_ids(self):
+        """Number the nets without id"""
+        _id = 1
+        for net in self._nets:
+            if net._id is None:
+                while _id in self._ids:
+                    _id += 1
+                self.assign_id(net, _id)
+                _id += 1
+
+####################################################################################################
+
 class KiCadSchema(Sexpression):
 
+    _logger = _module_logger.getChild("KiCadSchema")
+
     GROUND_SYMBOLS = (
         'spice-ngspice:0',
     )
 
+    # Use spatial indexes to guess the netlist, else a O(n^2) brute-force algorithm
+    USE_SPATIAL_INDEX = True
+
+    # Use the vectorised queries of :mod:`KiCadRW.batch_geometry` with the spatial indexes.  NumPy
+    # is an optional dependency, without it the wires are indexed by a SegmentIndex, see
+    # _match_spatial_index.  With it, the vectorised grid is about 2x faster than the SegmentIndex,
+    # see examples/benchmarks/benchmark-segment-index.py.
+    USE_BATCH_GEOMETRY = batch_geometry.HAS_NUMPY
+
+    # Quantise the coordinates to integer nanometres, see :meth:`__init__`
+    INTEGER_COORDINATES = False
+
+    # Process-wide pool of the library symbols shared by the schematics, None to disable it
+    SYMBOL_LIB_POOL = SymbolLibPool()
+
+    # Drawing items which are not required to guess the netlist, they are loaded lazily
+    LAZY_TAGS = (
+        'arc',
+        'bezier',
+        'circle',
+        'effects',
+        'fill',
+        'polyline',
+        'rectangle',
+        'stroke',
+        'text',
+    )
+
+    # Attributes filled by _read which are stored in the parse cache
+    _MODEL_ATTRIBUTES = (
+        '_version',
+        '_generator',
+        '_uuid',
+        '_paper',
+        '_symbol_libs',
+        '_wires',
+        '_buses',
+        '_junctions',
+        '_no_connections',
+        '_bus_entries',
+        '_labels',
+        '_global_labels',
+        '_hierarchical_labels',
+        '_symbols',
+        '_sheets',
+    )
+
     ##############################################
 
-    def __init__(self, path):
+    def __init__(self, path, backend=None, cache=None, guess_netlist=True, integer_coordinates=None):
+        """Load a schematic file.
+
+        *backend* selects the parser backend, see :mod:`KiCadRW.sexp.parser`.
+
+        *cache* is an optional :class:`KiCadRW.sexp.cache.ParseCache` instance, or :obj:`True` to use
+        the default cache, to store the extracted model.
+
+        If *guess_netlist* is false, :meth:`guess_netlist` must be called to compute the netlist.
+
+        If *integer_coordinates* is true, coordinates are converted to integer nanometres at load
+        time, like KiCad does internally.  Positions are then compared exactly and are hashable,
+        thus pins and wire extremities are matched using dictionaries.  It defaults to
+        :attr:`INTEGER_COORDINATES`.
+        """
+
+        if integer_coordinates is None:
+            integer_coordinates = self.INTEGER_COORDINATES
+        self._integer_coordinates = bool(integer_coordinates)
 
         self._symbol_libs = {}
         self._wires = []
@@ -576,12 +966,22 @@ class KiCadSchema(Sexpression):
         self._hierarchical_labels = []
         self._symbols = []
         self._sheets = []
+        self._netlist = Netlist()
 
-        self._read(path)
-        self._guess_netlist()
+        self._backend = backend
+        if cache:
+            self._read_cached(path, cache)
+        else:
+            self._read(path)
+        if guess_netlist:
+            self._guess_netlist()
 
     ##############################################
 
+    @property
+    def integer_coordinates(self):
+        return self._integer_coordinates
+
     @property
     def symbol_libs(self):
         return iter(self._symbol_libs)
@@ -614,7 +1014,7 @@ class KiCadSchema(Sexpression):
 
     @property
     def no_connections(self):
-        return iter(self._no_connection)
+        return iter(self._no_connections)
 
     @property
     def bus_entries(self):
@@ -632,17 +1032,62 @@ class KiCadSchema(Sexpression):
     def hierarchical_labels(self):
         return iter(self._hierarchical_labels)
 
+    @property
+    def sheets(self):
+        return iter(self._sheets)
+
+    @property
+    def sheet_pins(self):
+        return [pin for sheet in self._sheets for pin in sheet.pins]
+
+    @property
+    def netlist(self):
+        return self._netlist
+
+    @property
+    def nets(self):
+        return iter(self._netlist)
+
+    ##############################################
+
+    def _read_cached(self, path, cache):
+        from .cache import ParseCache
+        if cache is True:
+            cache = ParseCache()
+        with open(path, 'rb') as fh:
+            kind = self.__class__.__name__
+            if self._integer_coordinates:
+                kind += '/iu'
+            key = cache.key(fh.read(), kind)
+        state = cache.get(key)
+        if state is None:
+            self._read(path)
+            state = {_: getattr(self, _) for _ in self._MODEL_ATTRIBUTES if hasattr(self, _)}
+            cache.set(key, state)
+        else:
+            self.__dict__.update(state)
+            self.intern_symbol_libs()
+
+    ##############################################
+
+    def _xy(self, at):
+        """Return the coordinates of an ``at`` or ``xy`` item"""
+        if self._integer_coordinates:
+            return to_iu(at[0]), to_iu(at[1])
+        return at[0], at[1]
+
     ##############################################
 
     def _read(self, path):
 
-        s_data = self.load(path)
+        s_data = self.load(path, self._backend, self.LAZY_TAGS)
 
         if car_value(s_data) != 'kicad_sch':
             raise ValueError()
 
         for sexpr in cdr(s_data):
-            _car_value = car_value(sexpr)
+            # don't parse the lazy S-expressions
+            _car_value = tag_of(sexpr)
 
             if _car_value == 'version':
                 # ('version', 20210406)
@@ -666,14 +1111,14 @@ class KiCadSchema(Sexpression):
 
             elif _car_value == 'junction':
                 # ('junction', ('at', 111.76, 73.66), ('diameter', 1.016), ('color', 0, 0, 0, 0))
-                _, d = self.to_dict(sexpr)
-                junction = Junction(*d['at'])
+                record = POSITION_RECORD.extract(sexpr)
+                junction = Junction(*self._xy(record.at))
                 self._junctions.append(junction)
 
             elif _car_value == 'no_connect':
                 # (no_connect (at 177.8 50.8) (uuid b47f754e-304e-4f98-968e-20e5e5d18e29))
-                _, d = self.to_dict(sexpr)
-                no_connection = NoConnection(*d['at'])
+                record = POSITION_RECORD.extract(sexpr)
+                no_connection = NoConnect(*self._xy(record.at))
                 self._no_connections.append(no_connection)
 
             elif _car_value == 'bus_entry':
@@ -681,8 +1126,8 @@ class KiCadSchema(Sexpression):
                 #   (stroke (width 0.1524) (type solid) (color 0 0 0 0))
                 #   (uuid 55cddc77-72fd-4412-84fa-867166598c36)
                 # )
-                _, d = self.to_dict(sexpr)
-                bus_entry = BusEntry(*d['at'])
+                record = POSITION_RECORD.extract(sexpr)
+                bus_entry = BusEntry(*self._xy(record.at))
                 self._bus_entries.append(bus_entry)
 
             elif _car_value == 'wire':
@@ -690,9 +1135,8 @@ class KiCadSchema(Sexpression):
                 #     ('pts', ('xy', 140.97, 73.66), ('xy', 144.78, 73.66)),
                 #     ('stroke', ('width', 0), ('type', 'solid'), ('color', 0, 0, 0, 0)),
                 #     ('uuid', '53b6c7f9-e319-4bc4-82b5-f7c696f8e2db')
-                _, d = self.to_dict(sexpr)
-                self.fix_key_as_list(d['pts'], 'xy', 'xys')
-                start_point, end_point = d['pts']['xys']
+                record = SEGMENT_RECORD.extract(sexpr)
+                start_point, end_point = [self._xy(_) for _ in record.pts.xys]
                 wire = Wire(len(self._wires), start_point, end_point)
                 self._wires.append(wire)
 
@@ -701,10 +1145,9 @@ class KiCadSchema(Sexpression):
                 #    (stroke (width 0) (type solid) (color 0 0 0 0))
                 #    (uuid 1029c8b7-917c-4b83-8b82-040bab29659a)
                 #  )
-                _, d = self.to_dict(sexpr)
-                self.fix_key_as_list(d['pts'], 'xy', 'xys')
-                start_point, end_point = d['pts']['xys']
-                bus = Bus(len(self._buss), start_point, end_point)
+                record = SEGMENT_RECORD.extract(sexpr)
+                start_point, end_point = [self._xy(_) for _ in record.pts.xys]
+                bus = Bus(len(self._buses), start_point, end_point)
                 self._buses.append(bus)
 
             elif _car_value == 'label':
@@ -712,10 +1155,8 @@ class KiCadSchema(Sexpression):
                 #   (effects (font (size 1.27 1.27)) (justify right bottom))
                 #   (uuid d18a8a30-fded-4d73-acd2-a0615b9eda55)
                 # )
-                _, d = self.to_dict(sexpr)
-                name = self.sattr(d)
-                at = d['at'][:2]
-                label = Label(name, *at)
+                record = LABEL_RECORD.extract(sexpr)
+                label = Label(record.name, *self._xy(record.at))
                 self._labels.append(label)
 
             elif _car_value == 'global_label':
@@ -726,9 +1167,8 @@ class KiCadSchema(Sexpression):
                 #     (effects (font (size 1.27 1.27)) (justify right) hide)
                 #   )
                 # )
-                _, d = self.to_dict(sexpr)
-                name = self.sattr(d)
-                global_label = GlobalLabel(name, *d['at'])
+                record = LABEL_RECORD.extract(sexpr)
+                global_label = GlobalLabel(record.name, *self._xy(record.at))
                 self._global_labels.append(global_label)
 
             elif _car_value == 'hierarchical_label':
@@ -736,9 +1176,8 @@ class KiCadSchema(Sexpression):
                 #   (effects (font (size 1.27 1.27)) (justify left))
                 #   (uuid 2f06b05a-b838-4b5e-be45-45567e9ea945)
                 # )
-                _, d = self.to_dict(sexpr)
-                name = self.sattr(d)
-                hierarchical_label = HierarchicalLabel(name, *d['at'])
+                record = LABEL_RECORD.extract(sexpr)
+                hierarchical_label = HierarchicalLabel(record.name, *self._xy(record.at))
                 self._hierarchical_labels.append(hierarchical_label)
 
             elif _car_value == 'symbol':
@@ -760,7 +1199,7 @@ class KiCadSchema(Sexpression):
                 #     (uuid b0424fd4-3d1f-4f3b-be2f-1ff8781c6ef2)
                 #   )
                 # )
-                pass
+                self._on_sheet(sexpr)
 
             elif _car_value == 'sheet_instances':
                 # (sheet_instances
@@ -831,25 +1270,31 @@ class KiCadSchema(Sexpression):
         #     )
         # )
 
-        _, d = self.to_dict(sexpr)
-        self.fix_key_as_dict(d, 'property', 'properties')
-        self.fix_key_as_dict(d, 'symbol', 'symbols')
-        for _ in d['symbols'].values():
-            self.fix_key_as_list(_, 'polyline', 'polylines')
-            self.fix_key_as_list(_, 'pin', 'pins')
+        record = LIB_SYMBOL_RECORD.extract(sexpr)
+        pins = [(pin.number, pin.name, *self._xy(pin.at)) for unit in record.units for pin in unit.pins]
+        pool = self.SYMBOL_LIB_POOL
+        if pool is not None:
+            symbol_lib = pool.get(record.name, pins)
+        else:
+            symbol_lib = SymbolLib(record.name, pins)
+        self._symbol_libs[record.name] = symbol_lib
 
-        name = self.sattr(d)
-        symbol_lib = SymbolLib(name)
-        self._symbol_libs[name] = symbol_lib
-        # kind of XPath to get pins...
-        for d1 in d['symbols'].values():
-            for key, d2 in d1.items():
-                if key == 'pins':
-                    for spin in d2:
-                        number = self.sattr(spin['number'])
-                        name = self.sattr(spin['name'])
-                        at = spin['at'][:2]
-                        symbol_lib.add_pin(number, name, *at)
+    ##############################################
+
+    def intern_symbol_libs(self):
+        """Replace the library symbols by the instances of the pool, e.g. for a model loaded from the
+        parse cache or built in another process.
+
+        """
+        pool = self.SYMBOL_LIB_POOL
+        if pool is None:
+            return
+        symbol_libs = {}
+        for name, symbol_lib in self._symbol_libs.items():
+            symbol_libs[name] = pool.intern(symbol_lib)
+        self._symbol_libs = symbol_libs
+        for symbol in self._symbols:
+            symbol._lib = symbol_libs[symbol.lib_name]
 
     ##############################################
 
@@ -871,30 +1316,42 @@ class KiCadSchema(Sexpression):
         #     ('pin', '1', ('uuid', '4eb52cb1-9134-412d-b80c-94785a2cfc61')),
         #     ('pin', '2', ('uuid', '15aa4aaa-9c23-451a-b015-db0e7f3f79c5'))
 
-        _, d = self.to_dict(sexpr)
-        self.fix_key_as_dict(d, 'property', 'properties')
-        self.fix_key_as_dict(d, 'pin', 'pins')
-
-        lib_id = d['lib_id']
-        lib = self._symbol_libs[lib_id]
-        properties = d['properties']
+        record = SYMBOL_RECORD.extract(sexpr)
+        lib = self._symbol_libs[record.lib_id]
+        properties = {_.name: _.value for _ in record.properties}
         symbol = Symbol(
             lib,
-            *d['at'],
-            mirror=d.get('mirror', None),
-            unit=d['unit'],
-            in_bom=d['in_bom'],
-            on_board=d['on_board'],
-            reference=self.sattr(properties['Reference']),
-            value=self.sattr(properties['Value']),
-            footprint=self.sattr(properties['Footprint']),
-            datasheet=self.sattr(properties['Datasheet']),
+            *self._xy(record.at),
+            record.at[2],
+            mirror=record.mirror,
+            unit=record.unit,
+            in_bom=record.in_bom,
+            on_board=record.on_board,
+            reference=properties['Reference'],
+            value=properties['Value'],
+            footprint=properties['Footprint'],
+            datasheet=properties['Datasheet'],
         )
         self._symbols.append(symbol)
 
     ##############################################
 
-    def _guess_netlist(self):
+    def _on_sheet(self, sexpr):
+        record = SHEET_RECORD.extract(sexpr)
+        # Property names are localised, thus we use the ids: 0 is the name and 1 the file
+        properties = {_.id: _.value for _ in record.properties}
+        sheet = Sheet(properties[0], properties[1], *self._xy(record.at))
+        for pin in record.pins:
+            sheet.add_pin(pin.name, *self._xy(pin.at))
+        self._sheets.append(sheet)
+
+    ##############################################
+
+    def guess_netlist(self):
+        self._guess_netlist()
+
+    def _match_brute_force(self):
+        """Connect the objects to the wires and the wires together, O(n^2) reference implementation"""
 
         for junction in self._junctions:
             for wire in self._wires:
@@ -919,42 +1376,195 @@ class KiCadSchema(Sexpression):
             for wire in self._wires:
                 wire.match_obj(hierarchical_label)
 
+        for sheet_pin in self.sheet_pins:
+            for wire in self._wires:
+                wire.match_obj(sheet_pin)
+
         # Match wires
         for wire1 in self._wires:
             for wire2 in self._wires:
                 if wire1 is not wire2:
                     wire1.match_extremities(wire2)
 
-        # Assign a net to wire set
+    ##############################################
+
+    def _match_spatial_index(self):
+        """Connect the objects to the wires and the wires together using spatial indexes.
+
+        Return the index of the wire extremities.
+        """
+
+        if self._integer_coordinates:
+            segments = SegmentIndex(to_iu(SpatialHash.DEFAULT_CELL_SIZE))
+            extremities = PointIndex()
+        else:
+            segments = SegmentIndex()
+            extremities = SpatialHash()
         for wire in self._wires:
-            if wire.net_id is None:
-                wire.net_id = NetId()
+            segments.insert_segment(wire, wire.start, wire.end)
+            extremities.insert_point(wire, wire.start)
+            extremities.insert_point(wire, wire.end)
+
+        # A junction connects the wires ending in the middle of another wire, i.e. a T-junction
+        for obj in chain(
+                self._junctions,
+                self._no_connections,
+                self._labels,
+                self._global_labels,
+                self._hierarchical_labels,
+                self.sheet_pins,
+        ):
+            for wire in segments.query(obj):
+                wire.match_obj(obj)
 
-        # Assign a net to pins
-        for symbol in self._symbols:
-            symbol.guess_netlist(self._wires)
+        # Match wires
+        for wire1 in self._wires:
+            candidates = extremities.query(wire1.start) + extremities.query(wire1.end)
+            for wire2 in dict.fromkeys(candidates):
+                if wire1 is not wire2:
+                    wire1.match_extremities(wire2)
 
-        # Find the ground
-        for symbol in self._symbols:
-            if symbol.lib_name in self.GROUND_SYMBOLS:
-                symbol.first_pin.net_id.id = 0
+        return extremities
 
-        # Use wire labels as ids
-        for label in self._labels:
-            if label.name and label.wires:
-                wire = next(label.wires)
-                wire.net_id.id = label.name
+    ##############################################
+
+    def _match_batch(self):
+        """Connect the objects and the pins to the wires, and the wires together, using the batch
+        queries of :mod:`KiCadRW.batch_geometry`.
+
+        """
+
+        if self._integer_coordinates:
+            cell_size = to_iu(SpatialHash.DEFAULT_CELL_SIZE)
+        else:
+            cell_size = SpatialHash.DEFAULT_CELL_SIZE
+        wires = self._wires
+        starts = [(_.start.x, _.start.y) for _ in wires]
+        ends = [(_.end.x, _.end.y) for _ in wires]
+        # extremity 2*i is the start of wire i and 2*i+1 its end
+        extremities = [xy for _ in zip(starts, ends) for xy in _]
+
+        objects = list(chain(
+            self._junctions,
+            self._no_connections,
+            self._labels,
+            self._global_labels,
+            self._hierarchical_labels,
+            self.sheet_pins,
+        ))
+        points = [(_.x, _.y) for _ in objects]
+        for i, j in batch_geometry.points_on_segments(points, starts, ends, cell_size):
+            objects[i].connect_wire(wires[j])
+
+        # Match wires
+        pairs = batch_geometry.match_points(extremities, extremities, cell_size)
+        for wire1, wire2 in dict.fromkeys((i // 2, j // 2) for i, j in pairs):
+            if wire1 != wire2:
+                wires[wire1].match_extremities(wires[wire2])
+
+        pins = [pin for symbol in self._symbols for pin in symbol.place_pins()]
+        points = [(_.x, _.y) for _ in pins]
+        for i, j in batch_geometry.match_points(points, extremities, cell_size):
+            pins[i].connect_wire(wires[j // 2])
+
+    ##############################################
+
+    def _guess_netlist(self):
+
+        if self.USE_SPATIAL_INDEX and self.USE_BATCH_GEOMETRY:
+            self._match_batch()
+        else:
+            if self.USE_SPATIAL_INDEX:
+                index = self._match_spatial_index()
+            else:
+                self._match_brute_force()
+                index = None
+            for symbol in self._symbols:
+                symbol.connect_pins(self._wires, index)
+
+        self._build_nets()
+
+    ##############################################
+
+    def _build_nets(self):
+        """Group the connected objects in nets using a disjoint-set"""
+
+        nets = DisjointSet()
+
+        # Add the wires first so as to number the nets in the wire order
+        for wire in self._wires:
+            nets.add(wire)
+            for _ in wire.connections:
+                nets.union(wire, _)
+
+        pins = [pin for symbol in self._symbols for pin in symbol.pins]
+        labels = (self._labels, self._global_labels, self._hierarchical_labels)
+        sheet_pins = self.sheet_pins
+        for obj in chain(self._junctions, self._no_connections, *labels, sheet_pins, pins):
+            nets.add(obj)
+            for wire in obj.wires:
+                nets.union(obj, wire)
+
+        # Pins, labels and sheet pins can be connected without wire
+        pin_index = PointIndex() if self._integer_coordinates else SpatialHash()
+        for pin in pins:
+            pin_index.insert_point(pin, pin)
+        for obj in chain(pins, *labels, sheet_pins):
+            for pin in pin_index.query(obj):
+                if pin is not obj and pin == obj:
+                    nets.union(obj, pin)
+
+        # Labels with the same name are connected
+        for _labels in labels:
+            first_labels = {}
+            for label in _labels:
+                if label.name:
+                    nets.union(first_labels.setdefault(label.name, label), label)
+
+        ground_pins = [_.first_pin for _ in self._symbols if _.lib_name in self.GROUND_SYMBOLS]
+        for pin in ground_pins[1:]:
+            nets.union(ground_pins[0], pin)
+
+        netlist = self._netlist = Netlist()
+        for members in nets.groups():
+            # an isolated pin is not a net
+            if len(members) > 1 or isinstance(members[0], Wire):
+                netlist.new_net(members)
+
+        for pin in pins:
+            if pin.net_id is None:
+                self._logger.warning(f"Net not found for pin {pin.number} @{pin}")
+
+        # Find the ground
+        if ground_pins and ground_pins[0].net_id is not None:
+            netlist.assign_id(ground_pins[0].net_id, 0)
+
+        # Use labels as ids
+        for net in netlist:
+            if net.id is None:
+                names = [_.name for _ in net.labels if _.name]
+                if names:
+                    name = names[0]
+                    if len(set(names)) > 1:
+                        self._logger.warning(f"Net {name} has several names: {' '.join(names)}")
+                    try:
+                        netlist.assign_id(net, name)
+                    except NameError:
+                        self._logger.warning(f"Net name {name} is already assigned")
 
         # Assign remaining ids
-        NetId.assign_ids()
+        netlist.assign_ids()
 
   ##############################################
 
     def dump_netlist(self):
-        print(f"Number of nets: {NetId.UUID}")
+        print(f"Number of nets: {len(self._netlist)}")
         for symbol in self._symbols:
             print(f"{symbol.reference} {symbol.value}")
             print(f"    @({symbol.x}, {symbol.y})  angle: {symbol.angle}")
             for pin in symbol.pins:
                 net_id = str(pin.net_id)
-                print(f"  p#{pin.number} {pin.name} -> {net_id: <30}   @({pin.x:.2f}, {pin.y:.2f})")
+                x, y = pin.x, pin.y
+                if self._integer_coordinates:
+                    x, y = to_mm(x), to_mm(y)
+                print(f"  p#{pin.number} {pin.name} -> {net_id: <30}   @({x:.2f}, {y:.2f})")
@@ -0,0 +1,180 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'ATOM',
+    'END',
+    'START',
+    'iter_items',
+    'iter_items_path',
+    'iterparse',
+    'iterparse_path',
+]
+
+####################################################################################################
+
+"""This module implements a streaming (SAX-style) S-expression parser.
+
+:func:`iterparse` reads a file handle or a :class:`mmap.mmap` by chunks and yields events:
+
+* ``(START, tag, depth)`` when an S-expression is opened, *tag* is its car and the root has a depth of 0,
+* ``(ATOM, value)`` for each atom of the cdr,
+* ``(END, tag)`` when an S-expression is closed.
+
+No tree is built, thus the memory usage doesn't depend on the file size.
+
+:func:`iter_items` builds on top of it and only materialises the top-level items matching a set of
+tags, for example::
+
+    for item in iter_items_path(path, ('symbol', 'wire', 'junction', 'label')):
+        ...
+
+"""
+
+####################################################################################################
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Iterator
+import mmap
+import re
+
+from sexpdata import Symbol
+
+from .parser import ParseError, _TOKEN_RE, token_value
+
+####################################################################################################
+
+START = 'start'
+ATOM = 'atom'
+END = 'end'
+
+CHUNK_SIZE = 64 * 1024
+
+_BYTES_TOKEN_RE = re.compile(_TOKEN_RE.pattern.encode('ascii'), re.DOTALL)
+
+####################################################################################################
+
+# Bounded cache so as to keep the memory usage flat on large files
+_cached_token_value = lru_cache(maxsize=4096)(token_value)
+
+####################################################################################################
+
+def _iter_tokens(source, chunk_size: int = CHUNK_SIZE) -> Iterator[str]:
+    """Yield the tokens read from a text or binary file handle"""
+    remainder = None
+    while True:
+        chunk = source.read(chunk_size)
+        if remainder is None:
+            # first chunk
+            is_bytes = isinstance(chunk, (bytes, bytearray))
+            if is_bytes:
+                finditer = _BYTES_TOKEN_RE.finditer
+                quote = b'"'
+            else:
+                finditer = _TOKEN_RE.finditer
+                quote = '"'
+            remainder = chunk[:0]
+        eof = not chunk
+        buffer = remainder + chunk
+        end = len(buffer)
+        remainder = buffer[:0]
+        for match in finditer(buffer):
+            token = match.group()
+            # A token which reach the end of the buffer could continue in the next chunk
+            if not eof and (match.end() == end or token == quote):
+                remainder = buffer[match.start():]
+                break
+            if is_bytes:
+                token = token.decode('utf8')
+            yield token
+        if eof:
+            break
+
+####################################################################################################
+
+def iterparse(source, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield parser events read from a file handle or a mmap"""
+    tags = []
+    opened = False
+    for token in _iter_tokens(source, chunk_size):
+        if opened:
+            opened = False
+            if token != '(' and token != ')':
+                tag = _cached_token_value(token)
+                tags.append(tag)
+                yield (START, tag, len(tags) - 1)
+                continue
+            tags.append(None)
+            yield (START, None, len(tags) - 1)
+        if token == '(':
+            opened = True
+        elif token == ')':
+            if not tags:
+                raise ParseError("Too many closing parenthesis")
+            yield (END, tags.pop())
+        else:
+            yield (ATOM, _cached_token_value(token))
+    if opened or tags:
+        raise ParseError("Not enough closing parenthesis")
+
+####################################################################################################
+
+def iter_items(source, tags: Iterable[str] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[list]:
+    """Yield the top-level items of a file as nested lists, filtered by tags.
+
+    Items are built as :func:`KiCadRW.sexp.parser.loads` does, unrequested items are skipped.
+    """
+    if tags is not None:
+        tags = {Symbol(_) for _ in tags}
+    stack = []
+    for event in iterparse(source, chunk_size):
+        kind = event[0]
+        if kind is ATOM:
+            if stack:
+                stack[-1].append(event[1])
+        elif kind is START:
+            _, tag, depth = event
+            if stack:
+                node = [] if tag is None else [tag]
+                stack[-1].append(node)
+                stack.append(node)
+            elif depth == 1 and (tags is None or tag in tags):
+                stack.append([tag])
+        elif stack:
+            node = stack.pop()
+            if not stack:
+                yield node
+
+####################################################################################################
+
+def _open_mmap(path: str):
+    with open(path, 'rb') as fh:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+def iterparse_path(path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield parser events of a file, the file is memory mapped"""
+    with _open_mmap(Path(path)) as source:
+        yield from iterparse(source, chunk_size)
+
+def iter_items_path(path: str, tags: Iterable[str] = None, chunk_size: int = CHUNK_SIZE) -> Iterator[list]:
+    """Yield the top-level items of a file, the file is memory mapped"""
+    with _open_mmap(Path(path)) as source:
+        yield from iter_items(source, tags, chunk_size)
@@ -27,7 +27,8 @@ __all__ = [
 from enum import Enum, IntEnum, auto
 from typing import Any
 
-from . import Symbol, dumps
+from . import Symbol
+from .writer import dump, kicad_dumps
 # from . import SexpSymbols as Sym
 # pylint: disable=no-name-in-module
 from .SexpSymbols import (
@@ -124,7 +125,7 @@ class FontMixin:
             font.append(ITALIC)
         effects = [font]
         justify = [
-            Symbol(str(_).split('.')[1].lower())
+            Symbol(_.name.lower())
             for _ in JustifyStyle
             if _ & self._justify
         ]
@@ -372,4 +373,8 @@ class SymbolLibrary:
     ##############################################
 
     def dumps(self) -> str:
-        return dumps(self)
+        return kicad_dumps(self)
+
+    def dump(self, fh) -> None:
+        """Write the library to a text file object, the output is written incrementally"""
+        dump(self, fh)
@@ -0,0 +1,603 @@
+####################################################################################################
+#
+# KiCad-RW — Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = [
+    'FormattingPolicy',
+    'KiCadWriter',
+    'dump',
+    'kicad_dumps',
+    'policy_for',
+    'write_sexp',
+]
+
+####################################################################################################
+
+"""This module implements a S-expression writer using the KiCad formatting.
+
+KiCad breaks the line before some S-expressions, e.g. ``symbol``, ``property`` or ``pin``, and
+indents their content by two spaces.  The tree is walked once: the indentation of the current line
+is known from the nesting level, thus the output is written in order, chunk by chunk, and no
+intermediate string is built for the subtrees.
+
+:func:`dump` writes to a file object through a small buffer.  Objects implementing
+``__to_lisp_as__`` are converted when they are reached, thus the memory usage doesn't depend on the
+size of the output, e.g. for a symbol library having thousands of parts.
+
+The formatting rules are defined by a :class:`FormattingPolicy`.  The symbol library, schematic and
+PCB files are formatted differently, thus a policy is defined for each file type and is selected
+from the root car, e.g. ``kicad_sch``.  A :class:`KiCadWriter` doesn't rely on the
+:func:`sexpdata.tosexp` registry and keeps its state local to each call, thus writers using
+different policies can be used concurrently from several threads.
+
+The writer accepts the same objects than :func:`sexpdata.dumps`: lists, tuples,
+:class:`sexpdata.Delimiters`, objects implementing ``__to_lisp_as__``, symbols, strings and
+numbers.
+
+"""
+
+####################################################################################################
+
+from collections.abc import Iterable, Mapping
+from typing import Any, Callable
+
+import sexpdata as _sexpdata
+from sexpdata import Quoted, String, Symbol
+
+####################################################################################################
+
+BUFFER_SIZE = 64 * 1024
+
+# Maximum number of quoted atoms kept in cache, so as to keep the memory usage flat
+ATOM_CACHE_SIZE = 4096
+
+# Types which are always atoms
+_ATOM_TYPES = frozenset((Symbol, str, int, float))
+
+####################################################################################################
+
+# Formatting actions
+BREAK = 0x01            # break the line before the S-expression and indent its content
+SECTION = 0x02          # insert a blank line if the previous sibling has another car
+SEPARATE = 0x04         # insert a blank line after a previous sibling
+BREAK_ITEMS = 0x08      # break the line before each list item
+BREAK_ATOMS = 0x10      # break the line before each atom but the car
+BREAK_CLOSER = 0x20     # break the line before the closing parenthesis
+INLINE_CLOSER = 0x40    # don't break the line before the closing parenthesis
+END_LINE = 0x80         # break the line after the closing parenthesis
+INLINE_FIRST = 0x100    # don't break the line before a list item following an atom, e.g. the car
+
+# Notes:
+#  - By default, the closing parenthesis is on its own line if the line was broken inside the
+#    S-expression.
+#  - A key is a car or a path of cars, e.g. 'name/effects' is an effects within a name and overrides
+#    the rule for 'effects'.
+
+SYMBOL_LIBRARY_RULES = {
+    'kicad_symbol_lib': BREAK_CLOSER | END_LINE,
+    'symbol': BREAK,
+    'property': BREAK,
+    'pin': BREAK,
+    'name': BREAK,
+    'number': BREAK,
+    'effects': BREAK,
+    'name/effects': 0,
+    'number/effects': 0,
+    'arc': BREAK,
+    'circle': BREAK,
+    'polyline': BREAK,
+    'rectangle': BREAK,
+    'text': BREAK,
+    'stroke': BREAK,
+    'fill': BREAK,
+    'polyline/pts': BREAK,
+    'pts/xy': BREAK,
+}
+
+SCHEMA_RULES = {
+    **SYMBOL_LIBRARY_RULES,
+    'kicad_sch': BREAK_CLOSER | END_LINE,
+    'kicad_sch/uuid': BREAK | SECTION,
+    'kicad_sch/paper': BREAK | SECTION,
+    'kicad_sch/title_block': BREAK | SECTION | BREAK_ITEMS,
+    'kicad_sch/lib_symbols': BREAK | SECTION | BREAK_ITEMS,
+    # within the graphics of a schematic symbol, fill is on the line of stroke
+    'lib_symbols/symbol/symbol/arc/fill': 0,
+    'lib_symbols/symbol/symbol/polyline/fill': 0,
+    'lib_symbols/symbol/symbol/rectangle/fill': 0,
+    # and a circle is on one line
+    'lib_symbols/symbol/symbol/circle/stroke': 0,
+    'lib_symbols/symbol/symbol/circle/fill': 0,
+    'kicad_sch/junction': BREAK | SECTION,
+    'kicad_sch/no_connect': BREAK | SECTION,
+    'kicad_sch/bus_entry': BREAK | SECTION,
+    'kicad_sch/wire': BREAK | SECTION,
+    'kicad_sch/bus': BREAK | SECTION,
+    'wire/pts/xy': 0,
+    'bus/pts/xy': 0,
+    'kicad_sch/polyline': BREAK | SECTION,
+    'kicad_sch/polyline/pts': 0,
+    'kicad_sch/polyline/pts/xy': 0,
+    'kicad_sch/text': BREAK | SECTION,
+    'kicad_sch/label': BREAK | SECTION,
+    'kicad_sch/global_label': BREAK | SECTION,
+    'kicad_sch/hierarchical_label': BREAK | SECTION,
+    'kicad_sch/image': BREAK | SECTION,
+    'kicad_sch/symbol': BREAK | SEPARATE,
+    'kicad_sch/symbol/in_bom': BREAK,
+    'kicad_sch/sheet': BREAK | SEPARATE,
+    'kicad_sch/sheet_instances': BREAK | SECTION | BREAK_ITEMS,
+    'kicad_sch/symbol_instances': BREAK | SECTION | BREAK_ITEMS,
+    'symbol_instances/path/reference': BREAK,
+    'image/data': BREAK | BREAK_ATOMS,
+    'uuid': BREAK,
+    'no_connect/uuid': 0,
+    'symbol/pin/uuid': 0,
+}
+
+PCB_RULES = {
+    'kicad_pcb': BREAK_CLOSER | END_LINE,
+    'kicad_pcb/general': BREAK | SECTION | BREAK_ITEMS,
+    'kicad_pcb/paper': BREAK | SECTION,
+    'kicad_pcb/title_block': BREAK | BREAK_ITEMS,
+    'kicad_pcb/layers': BREAK | SECTION | BREAK_ITEMS,
+    'kicad_pcb/setup': BREAK | SECTION | BREAK_ITEMS,
+    'pcbplotparams': BREAK_ITEMS,
+    'stackup': BREAK_ITEMS,
+    'kicad_pcb/net': BREAK | SECTION,
+    'kicad_pcb/footprint': BREAK | SEPARATE,
+    'kicad_pcb/gr_arc': BREAK,
+    'kicad_pcb/gr_circle': BREAK | SECTION,
+    'kicad_pcb/gr_line': BREAK,
+    'kicad_pcb/gr_poly': BREAK,
+    'kicad_pcb/gr_rect': BREAK,
+    'kicad_pcb/gr_text': BREAK,
+    'kicad_pcb/dimension': BREAK,
+    'kicad_pcb/segment': BREAK,
+    'kicad_pcb/arc': BREAK,
+    'kicad_pcb/via': BREAK,
+    'kicad_pcb/zone': BREAK | SECTION,
+    'footprint/tedit': BREAK,
+    'footprint/at': BREAK,
+    'footprint/descr': BREAK,
+    'footprint/tags': BREAK,
+    'footprint/property': BREAK,
+    'footprint/path': BREAK,
+    'footprint/attr': BREAK,
+    'footprint/fp_text': BREAK,
+    'footprint/fp_arc': BREAK,
+    'footprint/fp_circle': BREAK,
+    'footprint/fp_line': BREAK,
+    'footprint/fp_poly': BREAK | INLINE_CLOSER,
+    'footprint/fp_rect': BREAK,
+    'footprint/pad': BREAK | INLINE_CLOSER,
+    'footprint/model': BREAK | BREAK_ITEMS,
+    'pad/net': BREAK,
+    'effects': BREAK,
+    'fp_text/tstamp': BREAK,
+    'fp_poly/pts': INLINE_CLOSER | INLINE_FIRST,
+    'dimension/pts': BREAK,
+    'dimension/height': BREAK,
+    'dimension/gr_text': BREAK,
+    'dimension/format': BREAK,
+    'dimension/style': BREAK,
+    'zone/priority': BREAK,
+    'zone/connect_pads': BREAK,
+    'zone/min_thickness': BREAK,
+    'zone/keepout': BREAK,
+    'zone/fill': BREAK,
+    'zone/polygon': BREAK,
+    'zone/filled_polygon': BREAK,
+    'filled_polygon/layer': BREAK,
+    'polygon/pts': BREAK,
+    'filled_polygon/pts': BREAK,
+    'pts/xy': BREAK,
+    'dimension/pts/xy': 0,
+}
+
+####################################################################################################
+
+class _Rule:
+
+    """Node of the rules tree, the contexts are keyed by the car of the parent"""
+
+    __slots__ = ('action', 'contexts')
+
+    ##############################################
+
+    def __init__(self, action: int) -> None:
+        self.action = action
+        self.contexts = None
+
+####################################################################################################
+
+class FormattingPolicy:
+
+    """Formatting rules of :class:`KiCadWriter`.
+
+    The rules map a car, or a path of cars, to an action.  They are compiled once to a dictionary
+    keyed by car, thus the writer only does a lookup per S-expression.  A policy is immutable, thus
+    it can be shared between threads.
+    """
+
+    ##############################################
+
+    def __init__(
+            self,
+            rules: dict[str, int],
+            float_digits: dict[str, int] = None,
+            precision: int = None,
+            indent: str = '  ',
+    ) -> None:
+        self._rules = self._compile(rules)
+        # Number of digits of the floats within these S-expressions, None for the shortest repr
+        self._float_digits = dict(float_digits or {})
+        # Else the maximum number of digits without the trailing zeros, or the shortest repr if None
+        self._precision = precision
+        self._indent = str(indent)
+
+    ##############################################
+
+    @staticmethod
+    def _compile(rules: dict[str, int]) -> dict[str, _Rule]:
+        compiled = {}
+        # shorter paths first, so as to inherit their action
+        for path in sorted(rules, key=lambda _: _.count('/')):
+            cars = path.split('/')
+            car = cars.pop()
+            node = compiled.get(car)
+            if node is None:
+                node = compiled[car] = _Rule(0)
+            while cars:
+                car = cars.pop()
+                if node.contexts is None:
+                    node.contexts = {}
+                parent = node
+                node = node.contexts.get(car)
+                if node is None:
+                    node = parent.contexts[car] = _Rule(parent.action)
+            node.action = rules[path]
+        return compiled
+
+    ##############################################
+
+    @property
+    def indent(self) -> str:
+        return self._indent
+
+    ##############################################
+
+    def action(self, car: str, car_stack: list) -> int:
+        """Return the action for an S-expression within *car_stack*"""
+        node = self._rules.get(car)
+        if node is None:
+            return 0
+        i = len(car_stack)
+        while node.contexts is not None and i:
+            i -= 1
+            context = node.contexts.get(car_stack[i])
+            if context is None:
+                break
+            node = context
+        return node.action
+
+    ##############################################
+
+    def format_float(self, obj: float, car: str) -> str:
+        digits = self._float_digits.get(car, self._precision)
+        if digits is None:
+            return str(obj)
+        if car in self._float_digits:
+            _ = round(obj, digits)
+            return f'{_:.{digits}f}'
+        text = repr(obj)
+        # the shortest repr is used if it is a short decimal
+        point = text.find('.')
+        if 0 < point and len(text) - point - 1 <= digits and 'e' not in text:
+            _ = text[:-2] if text.endswith('.0') else text
+        else:
+            _ = f'{obj:.{digits}f}'.rstrip('0').rstrip('.')
+        return '0' if _ == '-0' else _
+
+####################################################################################################
+
+SYMBOL_LIBRARY_POLICY = FormattingPolicy(SYMBOL_LIBRARY_RULES, float_digits={'at': 2})
+SCHEMA_POLICY = FormattingPolicy(SCHEMA_RULES, float_digits={'color': 4}, precision=4)
+PCB_POLICY = FormattingPolicy(PCB_RULES, float_digits={'hpglpendiameter': 6, 'xyz': None}, precision=6)
+
+# Policies by root car
+POLICIES = {
+    'kicad_symbol_lib': SYMBOL_LIBRARY_POLICY,
+    'kicad_sch': SCHEMA_POLICY,
+    'kicad_pcb': PCB_POLICY,
+}
+
+DEFAULT_POLICY = SYMBOL_LIBRARY_POLICY
+
+def policy_for(car: str) -> FormattingPolicy:
+    """Return the policy for a file from its root car"""
+    return POLICIES.get(car, DEFAULT_POLICY)
+
+####################################################################################################
+
+def _expression(obj: Any) -> tuple:
+    """Return (opener, items, closer) for an S-expression, or None for an atom"""
+    if isinstance(obj, _sexpdata.Delimiters):
+        return obj.opener, obj.I, obj.closer
+    if isinstance(obj, (list, tuple)):
+        if isinstance(obj, tuple) and hasattr(obj, '_asdict'):
+            return _expression(_sexpdata.Parens(obj._asdict()))
+        return '(', obj, ')'
+    if isinstance(obj, Mapping):
+        return _expression(_sexpdata.Parens(obj))
+    if isinstance(obj, Iterable) and not isinstance(obj, (str, bytes)):
+        return '(', list(obj), ')'
+    return None
+
+####################################################################################################
+
+class KiCadWriter:
+
+    """S-expression writer using a :class:`FormattingPolicy`.
+
+    If no policy is given, the policy is selected from the root car, see :func:`policy_for`.
+
+    The methods are re-entrant, the state of a serialisation is local to the call.
+    """
+
+    ##############################################
+
+    def __init__(self, policy: FormattingPolicy = None, buffer_size: int = BUFFER_SIZE) -> None:
+        self._policy = policy
+        self._buffer_size = int(buffer_size)
+
+    ##############################################
+
+    @property
+    def policy(self) -> FormattingPolicy:
+        return self._policy
+
+    ##############################################
+
+    def write(self, obj: Any, write: Callable[[str], Any], car_stack: list = None, indent: str = '') -> None:
+        """Write an object, *write* is called for each chunk of text.
+
+        *car_stack* is the list of the enclosing cars and *indent* the indentation of the enclosing
+        line, if the object is part of a larger tree.
+        """
+
+        while hasattr(obj, '__to_lisp_as__'):
+            obj = obj.__to_lisp_as__()
+
+        car_stack = [] if car_stack is None else list(car_stack)
+
+        policy = self._policy
+        if policy is None:
+            if car_stack:
+                root_car = car_stack[0]
+            else:
+                expression = _expression(obj)
+                items = expression[1] if expression is not None else None
+                root_car = str(items[0]) if items and isinstance(items[0], Symbol) else None
+            policy = policy_for(root_car)
+        rules = policy._rules
+        format_float = policy.format_float
+        indent_step = policy.indent
+
+        # A separator is only written if the next item is on the same line
+        separator = False
+        # car of the last written object, None for an atom
+        last_car = None
+
+        # Atoms are repeated a lot, thus we quote them once
+        symbols = {}
+        strings = {}
+        # floats by car
+        floats = {}
+
+        def write_atom(obj: Any) -> str:
+            if isinstance(obj, Symbol):
+                text = symbols.get(obj)
+                if text is None:
+                    if len(symbols) >= ATOM_CACHE_SIZE:
+                        symbols.clear()
+                    text = symbols[obj] = Symbol.quote(obj)
+                return text
+            elif isinstance(obj, str):
+                text = strings.get(obj)
+                if text is None:
+                    if len(strings) >= ATOM_CACHE_SIZE:
+                        strings.clear()
+                    text = strings[obj] = '"' + String.quote(obj) + '"'
+                return text
+            elif isinstance(obj, bool):
+                return 't' if obj else '()'
+            elif isinstance(obj, float):
+                car = car_stack[-1] if car_stack else None
+                cache = floats.get(car)
+                if cache is None:
+                    cache = floats[car] = {}
+                text = cache.get(obj)
+                if text is None:
+                    if len(cache) >= ATOM_CACHE_SIZE:
+                        cache.clear()
+                    text = cache[obj] = format_float(obj, car)
+                return text
+            elif isinstance(obj, int):
+                return str(obj)
+            elif obj is None:
+                return '()'
+            # fallback to sexpdata
+            return _sexpdata.tosexp(obj, car_stack=car_stack)
+
+        def write_obj(obj: Any, indent: str, parent_action: int = 0, previous_car: str = None) -> bool:
+            """Write an object and return True if a line was broken.
+
+            *indent* is the indentation of the lines broken inside the parent and *previous_car* the
+            car of the previous sibling if it is a list.
+            """
+            nonlocal separator, last_car
+
+            cls = obj.__class__
+            if cls is list:
+                expression = '(', obj, ')'
+            elif cls in _ATOM_TYPES:
+                expression = None
+            else:
+                while hasattr(obj, '__to_lisp_as__'):
+                    obj = obj.__to_lisp_as__()
+                if isinstance(obj, Quoted):
+                    if separator:
+                        write(' ')
+                        separator = False
+                    write("'")
+                    return write_obj(obj.x, indent, parent_action, previous_car)
+                expression = _expression(obj)
+
+            if expression is None:
+                last_car = None
+                if separator:
+                    separator = False
+                    if parent_action & BREAK_ATOMS:
+                        write('\n' + indent + indent_step)
+                        write(write_atom(obj))
+                        return True
+                    write(' ')
+                write(write_atom(obj))
+                return False
+
+            opener, items, closer = expression
+            str_car = None
+            action = 0
+            if items and isinstance(items[0], Symbol):
+                str_car = str(items[0])
+                # inlined FormattingPolicy.action
+                rule = rules.get(str_car)
+                if rule is not None:
+                    i = len(car_stack)
+                    while rule.contexts is not None and i:
+                        i -= 1
+                        context = rule.contexts.get(car_stack[i])
+                        if context is None:
+                            break
+                        rule = context
+                    action = rule.action
+            if parent_action & BREAK_ITEMS:
+                action |= BREAK
+            elif parent_action & INLINE_FIRST and previous_car is None:
+                action &= ~BREAK
+
+            child_indent = indent
+            broken = False
+            if action & BREAK:
+                broken = True
+                child_indent = indent + indent_step
+                if previous_car is not None and (
+                        action & SEPARATE or (action & SECTION and previous_car != str_car)
+                ):
+                    write('\n\n' + child_indent)
+                else:
+                    write('\n' + child_indent)
+            elif separator:
+                write(' ')
+            separator = False
+
+            write(opener)
+            if str_car is not None:
+                car_stack.append(str_car)
+            broken_inside = False
+            item_car = None
+            inline_atoms = not action & BREAK_ATOMS
+            separator = False
+            for item in items:
+                if inline_atoms and item.__class__ in _ATOM_TYPES:
+                    # fast path
+                    if separator:
+                        write(' ')
+                    write(write_atom(item))
+                    item_car = None
+                elif write_obj(item, child_indent, action, item_car):
+                    broken_inside = True
+                    item_car = last_car
+                else:
+                    item_car = last_car
+                separator = True
+            if str_car is not None:
+                car_stack.pop()
+
+            if (broken_inside and not action & INLINE_CLOSER) or action & BREAK_CLOSER:
+                write('\n' + child_indent)
+            write(closer)
+            if action & END_LINE:
+                write('\n')
+            separator = False
+            last_car = '' if str_car is None else str_car
+            return broken or broken_inside
+
+        write_obj(obj, indent)
+
+    ##############################################
+
+    def dumps(self, obj: Any, car_stack: list = None, indent: str = '') -> str:
+        """Return the formatting of an object"""
+        chunks = []
+        self.write(obj, chunks.append, car_stack, indent)
+        return ''.join(chunks)
+
+    ##############################################
+
+    def dump(self, obj: Any, fh) -> None:
+        """Write an object to a text file object through a buffer"""
+        buffer_size = self._buffer_size
+        chunks = []
+        size = 0
+
+        def write(chunk: str) -> None:
+            nonlocal size
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= buffer_size:
+                fh.write(''.join(chunks))
+                chunks.clear()
+                size = 0
+        self.write(obj, write)
+        if chunks:
+            fh.write(''.join(chunks))
+
+####################################################################################################
+
+_default_writer = KiCadWriter()
+
+def format_float(obj: float, car: str) -> str:
+    return DEFAULT_POLICY.format_float(obj, car)
+
+def write_sexp(obj: Any, write: Callable[[str], Any], car_stack: list = None, indent: str = '') -> None:
+    """Write an object using the KiCad formatting, *write* is called for each chunk of text"""
+    _default_writer.write(obj, write, car_stack, indent)
+
+def kicad_dumps(obj: Any, car_stack: list = None, indent: str = '') -> str:
+    """Return the KiCad formatting of an object"""
+    return _default_writer.dumps(obj, car_stack, indent)
+
+def dump(obj: Any, fh, buffer_size: int = BUFFER_SIZE) -> None:
+    """Write an object using the KiCad formatting to a text file object"""
+    if buffer_size == BUFFER_SIZE:
+        _default_writer.dump(obj, fh)
+    else:
+        KiCadWriter(buffer_size=buffer_size).dump(obj, fh)
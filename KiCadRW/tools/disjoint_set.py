@@ -0,0 +1,103 @@
+####################################################################################################
+#
+# KiCad-RW - Python library to read/write KiCad Sexpr file format
+# Copyright (C) 2021 Fabrice Salvaire
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+####################################################################################################
+
+__all__ = ['DisjointSet']
+
+####################################################################################################
+
+from typing import Any, Iterator
+
+####################################################################################################
+
+class DisjointSet:
+
+    """Union-find structure with path compression and union by size.
+
+    Items are identified by their identity, thus they don't need to be hashable.
+    """
+
+    ##############################################
+
+    def __init__(self) -> None:
+        self._items = []
+        self._parents = []
+        self._sizes = []
+        self._indexes = {}
+
+    ##############################################
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: Any) -> bool:
+        return id(item) in self._indexes
+
+    ##############################################
+
+    def add(self, item: Any) -> int:
+        """Add an item as a singleton if it is not yet registered, return its index"""
+        key = id(item)
+        index = self._indexes.get(key)
+        if index is None:
+            index = len(self._items)
+            self._indexes[key] = index
+            self._items.append(item)
+            self._parents.append(index)
+            self._sizes.append(1)
+        return index
+
+    ##############################################
+
+    def _find(self, index: int) -> int:
+        parents = self._parents
+        while parents[index] != index:
+            # path halving
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    def find(self, item: Any) -> int:
+        """Return the index of the representative of the set containing item"""
+        return self._find(self.add(item))
+
+    ##############################################
+
+    def union(self, item1: Any, item2: Any) -> None:
+        root1 = self.find(item1)
+        root2 = self.find(item2)
+        if root1 == root2:
+            return
+        sizes = self._sizes
+        if sizes[root1] < sizes[root2]:
+            root1, root2 = root2, root1
+        self._parents[root2] = root1
+        sizes[root1] += sizes[root2]
+
+    def connected(self, item1: Any, item2: Any) -> bool:
+        return self.find(item1) == self.find(item2)
+
+    ##############################################
+
+    def groups(self) -> Iterator[list[Any]]:
+        """Yield the sets, ordered by their first item, items are in insertion order"""
+        groups = {}
+        for index, item in enumerate(self._items):
+            groups.setdefault(self._find(index), []).append(item)
+        return iter(groups.values())
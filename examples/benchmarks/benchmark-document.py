@@ -0,0 +1,63 @@
+####################################################################################################
+#
+# Compare a full re-serialisation to the lossless document model after a one property edit
+#
+#   python examples/benchmarks/benchmark-document.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import difflib
+import sys
+import time
+
+from sexpdata import Symbol
+
+from KiCadRW.sexp import dumps, parser
+from KiCadRW.sexp.document import Document
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/open-syringe-pump/indus/opensyringepump_indus.kicad_sch'
+)
+
+SYMBOL = Symbol('symbol')
+PROPERTY = Symbol('property')
+
+####################################################################################################
+
+def edit(sexpr: list) -> None:
+    """Change the value of the last symbol"""
+    symbol = [_ for _ in sexpr if isinstance(_, list) and _[0] == SYMBOL][-1]
+    for item in symbol:
+        if isinstance(item, list) and item[0] == PROPERTY and item[1] == 'Value':
+            item[2] = 'EDITED'
+            return
+
+def changed_lines(source: str, text: str) -> int:
+    diff = difflib.unified_diff(source.splitlines(), text.splitlines(), lineterm='', n=0)
+    return sum(1 for _ in diff if _[:1] in '+-' and _[:3] not in ('+++', '---'))
+
+####################################################################################################
+
+source = path.read_text(encoding='utf8')
+print(f"{path.name} {len(source.encode('utf8')) / 1024:.0f} kB")
+
+sexpr = parser.loads(source)
+edit(sexpr)
+start = time.perf_counter()
+text = dumps(sexpr)
+elapsed = time.perf_counter() - start
+print(f"  dumps     {elapsed * 1000:8.2f} ms  {changed_lines(source, text):6} changed lines")
+
+start = time.perf_counter()
+document = Document(source)
+load_time = time.perf_counter() - start
+edit(document.root)
+start = time.perf_counter()
+text = document.dumps()
+elapsed = time.perf_counter() - start
+print(f"  document  {elapsed * 1000:8.2f} ms  {changed_lines(source, text):6} changed lines"
+      f"  (load {load_time * 1000:.0f} ms)")
@@ -0,0 +1,65 @@
+####################################################################################################
+#
+# Compare the peak memory of SymbolLibrary.dumps and the streaming SymbolLibrary.dump
+#
+#   python examples/benchmarks/benchmark-dump.py
+#
+####################################################################################################
+
+from pathlib import Path
+import tempfile
+import time
+import tracemalloc
+
+from KiCadRW.sexp.symbol import JustifyStyle, SymbolLibrary
+
+####################################################################################################
+
+def make_library(number_of_parts: int) -> SymbolLibrary:
+    library = SymbolLibrary('20211014')
+    font_size = (1.27, 1.27)
+    for i in range(number_of_parts):
+        part = library.add_part(f'PART{i}')
+        part.add_property('Reference', 'U', font_size=font_size, at=(-10.16, 12.7),
+                          justify=JustifyStyle.LEFT | JustifyStyle.BOTTOM)
+        part.add_property('Value', f'PART{i}', font_size=font_size, at=(2.54, -12.7),
+                          justify=JustifyStyle.LEFT | JustifyStyle.TOP)
+        part.add_rectangle(start=(-10.16, 10.16), end=(10.16, -10.16))
+        for j in range(32):
+            side = -1 if j < 16 else 1
+            part.add_pin(f'P{j}', j + 1, 'bidirectional', at=(side * 15.24, 8.89 - (j % 16) * 1.27),
+                         angle=0 if side < 0 else 180, length=5.08, font_size=font_size, hide=False)
+    return library
+
+def measure(function) -> tuple[float, int]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+####################################################################################################
+
+print(f"{'parts':>6} {'size':>8} {'dumps peak':>11} {'dump peak':>10} {'dumps':>8} {'dump':>8}  same")
+with tempfile.TemporaryDirectory() as tmp_directory:
+    path = Path(tmp_directory, 'library.kicad_sym')
+    for number_of_parts in (100, 500, 2500):
+        library = make_library(number_of_parts)
+        text = None
+
+        def to_string():
+            global text
+            text = library.dumps()
+
+        def to_file():
+            with open(path, 'w', encoding='utf8') as fh:
+                library.dump(fh)
+        dumps_time, dumps_peak = measure(to_string)
+        dump_time, dump_peak = measure(to_file)
+        same = path.read_text(encoding='utf8') == text
+        size = len(text) / 2**20
+        text = None
+        print(f"{number_of_parts:6} {size:6.1f}MB {dumps_peak / 2**20:9.1f}MB {dump_peak / 2**20:8.2f}MB"
+              f" {dumps_time:7.2f}s {dump_time:7.2f}s  {same}")
@@ -0,0 +1,121 @@
+####################################################################################################
+#
+# Benchmark the spatial index and the batch queries against the brute-force algorithm to connect the
+# wires
+#
+#   python examples/benchmarks/benchmark-netlist.py
+#
+# Check the algorithms produce the same connectivity on kicad-examples and on synthetic sheets,
+# then report the timings for an increasing number of wires.  The batch queries are vectorised if
+# NumPy is available.
+#
+####################################################################################################
+
+from itertools import chain
+from pathlib import Path
+import tempfile
+import time
+
+from KiCadRW.batch_geometry import HAS_NUMPY
+from KiCadRW.sexp.schema import KiCadSchema
+
+####################################################################################################
+
+BRUTE_FORCE_MAX_WIRES = 2500
+
+####################################################################################################
+
+def synthetic_sheet(number_of_rows: int, number_of_columns: int) -> str:
+    """Build a sheet made of horizontal wire chains linked by vertical wires"""
+    step = 2.54
+    items = []
+
+    def add_wire(x1, y1, x2, y2):
+        items.append(f'(wire (pts (xy {x1:.2f} {y1:.2f}) (xy {x2:.2f} {y2:.2f})))')
+    for row in range(number_of_rows):
+        y = row * 2 * step
+        for column in range(number_of_columns):
+            x = column * step
+            add_wire(x, y, x + step, y)
+            if column % 4 == 0 and row + 1 < number_of_rows:
+                add_wire(x, y, x, y + 2 * step)
+            if column % 8 == 3:
+                items.append(f'(label "L{row}_{column}" (at {x + step/2:.3f} {y:.2f} 0))')
+            if column % 8 == 5:
+                items.append(f'(junction (at {x:.2f} {y:.2f}))')
+    body = '\n  '.join(items)
+    return f'(kicad_sch (version 20211123) (generator eeschema)\n  (lib_symbols)\n  {body}\n)\n'
+
+####################################################################################################
+
+def connectivity(schema: KiCadSchema) -> tuple:
+    wires = [
+        (sorted(_.id for _ in wire.connections), sorted((_[0].id, _[1]) for _ in wire._connection_types))
+        for wire in schema.wires
+    ]
+    objects = [
+        sorted(_.id for _ in obj.wires)
+        for obj in chain(
+            schema.junctions,
+            schema.no_connections,
+            schema.labels,
+            schema.global_labels,
+            schema.hierarchical_labels,
+            (pin for symbol in schema.symbols for pin in symbol.pins),
+        )
+    ]
+    return wires, objects
+
+def match(path: Path, method: str, integer_coordinates: bool = False) -> tuple:
+    schema = KiCadSchema(path, guess_netlist=False, integer_coordinates=integer_coordinates)
+    start = time.perf_counter()
+    if method == 'batch':
+        schema._match_batch()
+    else:
+        if method == 'brute force':
+            schema._match_brute_force()
+            index = None
+        else:
+            index = schema._match_spatial_index()
+        for symbol in schema.symbols:
+            symbol.connect_pins(schema._wires, index)
+    elapsed = time.perf_counter() - start
+    return elapsed, connectivity(schema)
+
+####################################################################################################
+
+print(f"Check kicad-examples, NumPy: {HAS_NUMPY}")
+for path in sorted(Path('kicad-examples').rglob('*.kicad_sch')):
+    try:
+        _, reference = match(path, 'brute force')
+    except Exception as exception:
+        print(f"  skip {path.name}: {exception}")
+        continue
+    _, result = match(path, 'index')
+    _, integer_result = match(path, 'index', True)
+    _, batch_result = match(path, 'batch')
+    _, integer_batch_result = match(path, 'batch', True)
+    same = reference == result == integer_result == batch_result == integer_batch_result
+    print(f"  {path.name:<60} {'same' if same else 'DIFFERENT'}")
+
+print()
+print(f"{'wires':>6} {'brute force':>12} {'index':>10} {'integer':>10} {'batch':>10} {'integer':>10}"
+      f" {'speedup':>8}  same")
+with tempfile.TemporaryDirectory() as tmp_directory:
+    for number_of_rows in (10, 20, 40, 80, 160, 320, 1280):
+        path = Path(tmp_directory, f'synthetic-{number_of_rows}.kicad_sch')
+        path.write_text(synthetic_sheet(number_of_rows, 10))
+        index_time, result = match(path, 'index')
+        integer_time, integer_result = match(path, 'index', True)
+        batch_time, batch_result = match(path, 'batch')
+        integer_batch_time, integer_batch_result = match(path, 'batch', True)
+        same = result == integer_result == batch_result == integer_batch_result
+        number_of_wires = len(result[0])
+        timings = f"{index_time:9.4f}s {integer_time:9.4f}s {batch_time:9.4f}s {integer_batch_time:9.4f}s"
+        if number_of_wires <= BRUTE_FORCE_MAX_WIRES:
+            brute_force_time, reference = match(path, 'brute force')
+            same &= reference == result
+            print(f"{number_of_wires:6} {brute_force_time:11.3f}s {timings}"
+                  f" {brute_force_time / index_time:7.0f}x  {same}")
+        else:
+            print(f"{number_of_wires:6} {'-':>12} {timings} {'-':>8}  {same}")
@@ -0,0 +1,82 @@
+####################################################################################################
+#
+# Measure the memory per node of the Objectifier tree against the former representation and the
+# columnar tree
+#
+#   python examples/benchmarks/benchmark-objectifier-memory.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import tracemalloc
+
+from sexpdata import car, cdr
+
+from KiCadRW.sexp import parser
+from KiCadRW.sexp.columnar import ColumnarTree
+from KiCadRW.sexp.objectifier import Node, Objectifier
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/open-syringe-pump/indus/opensyringepump_indus.kicad_sch'
+)
+
+####################################################################################################
+
+class LegacyNode:
+    """Former node, with an instance dict and a copy of the path"""
+
+    def __init__(self, path: list) -> None:
+        self._childs = []
+        self._path = path
+
+    def append_child(self, child) -> None:
+        self._childs.append(child)
+
+def legacy_walk(sexpr, path=[]):
+    if not isinstance(sexpr, list):
+        return sexpr
+    path = path.copy()
+    path.append(str(car(sexpr)))
+    node = LegacyNode(path)
+    for element in cdr(sexpr):
+        node.append_child(legacy_walk(element, path))
+    return node
+
+def count_nodes(sexpr) -> int:
+    if not isinstance(sexpr, list):
+        return 0
+    return 1 + sum(count_nodes(_) for _ in sexpr)
+
+def measure(function, sexpr) -> int:
+    tracemalloc.start()
+    tree = function(sexpr)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del tree
+    return size
+
+####################################################################################################
+
+file_size = path.stat().st_size
+sexpr = parser.load_path(path, 'sexpdata')
+number_of_nodes = count_nodes(sexpr)
+print(f"{path.name} {file_size / 1024:.0f} kB, {number_of_nodes} nodes")
+
+objectifier = Objectifier.__new__(Objectifier)
+for name, function in (
+        ('legacy', legacy_walk),
+        ('slotted', objectifier._walk_sexpr),
+        ('columnar', ColumnarTree.from_sexpr),
+):
+    size = measure(function, sexpr)
+    print(f"  {name:8} {size / 2**20:6.1f} MB  {size / number_of_nodes:6.1f} B/node"
+          f"  {size / file_size:5.1f}x file size")
+
+print(f"  Node instance: {Node.__basicsize__} B, has __dict__: {hasattr(Node('a'), '__dict__')}")
+
+tree = ColumnarTree.from_sexpr(sexpr)
+print(f"  columnar: {len(tree)} elements, {len(tree.to_bytes()) / 1024:.0f} kB serialised")
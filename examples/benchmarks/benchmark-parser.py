@@ -0,0 +1,65 @@
+####################################################################################################
+#
+# Benchmark the KiCad S-expression parser against sexpdata
+#
+#   python examples/benchmarks/benchmark-parser.py [kicad-examples]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+from KiCadRW.sexp import parser
+
+####################################################################################################
+
+examples_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'kicad-examples')
+paths = sorted(
+    _ for _ in examples_path.rglob('*')
+    if _.suffix in ('.kicad_sch', '.kicad_sym', '.kicad_pcb')
+)
+
+REPEAT = 3
+
+####################################################################################################
+
+def timeit(text, backend):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        sexpr = parser.loads(text, backend)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, sexpr
+
+####################################################################################################
+
+total_size = 0
+total_times = {_: 0 for _ in parser.BACKENDS}
+
+print(f"{'file':<60} {'size':>8} {'kicad MB/s':>11} {'sexpdata MB/s':>14} {'speedup':>8}  same")
+for path in paths:
+    with open(path, encoding='utf8') as fh:
+        text = fh.read()
+    size = len(text.encode('utf8')) / 2**20
+    total_size += size
+    results = {}
+    for backend in parser.BACKENDS:
+        elapsed, sexpr = timeit(text, backend)
+        total_times[backend] += elapsed
+        results[backend] = (elapsed, sexpr)
+    kicad_time, kicad_sexpr = results['kicad']
+    sexpdata_time, sexpdata_sexpr = results['sexpdata']
+    same = kicad_sexpr == sexpdata_sexpr
+    name = str(path.relative_to(examples_path))
+    print(
+        f"{name[-60:]:<60} {size*1024:7.0f}k {size/kicad_time:11.2f} {size/sexpdata_time:14.2f}"
+        f" {sexpdata_time/kicad_time:7.1f}x  {same}"
+    )
+
+print()
+print(f"Total {total_size:.2f} MB")
+for backend, elapsed in total_times.items():
+    print(f"  {backend:<10} {total_size/elapsed:6.2f} MB/s")
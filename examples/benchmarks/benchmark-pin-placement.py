@@ -0,0 +1,67 @@
+####################################################################################################
+#
+# Compare the former per pin matrix product to the pin offset tables of SymbolLib
+#
+#   python examples/benchmarks/benchmark-pin-placement.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+from KiCadRW.geometry import EuclidianMatrice, Vector
+from KiCadRW.sexp.schema import KiCadSchema
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/open-syringe-pump/indus/opensyringepump_indus.kicad_sch'
+)
+
+####################################################################################################
+
+def legacy_pin_position(symbol, pin) -> tuple:
+    """Former Symbol._pin_position"""
+    v = Vector(pin.x, -pin.y)
+    matrice = EuclidianMatrice.rotation(symbol.angle)
+    if symbol.mirror == 'x':
+        matrice = EuclidianMatrice.x_mirror(matrice)
+    elif symbol.mirror == 'y':
+        matrice = EuclidianMatrice.y_mirror(matrice)
+    p = v * matrice + symbol
+    return p.x, p.y
+
+def run_legacy(symbols) -> list:
+    return [legacy_pin_position(symbol, pin) for symbol in symbols for pin in symbol.lib.pins]
+
+def run_offsets(symbols) -> list:
+    positions = []
+    for symbol in symbols:
+        x, y = symbol.x, symbol.y
+        for pin, dx, dy in symbol.lib.pin_offsets(symbol.angle, symbol.mirror):
+            positions.append((x + dx, y + dy))
+    return positions
+
+def timeit(function, repeat: int = 10) -> tuple[float, list]:
+    """Return the best time of *repeat* runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+####################################################################################################
+
+schema = KiCadSchema(path, guess_netlist=False)
+symbols = list(schema.symbols)
+print(f"{path.name} {len(symbols)} symbols")
+for scale in (1, 10, 100):
+    _symbols = symbols * scale
+    legacy_time, expected = timeit(lambda: run_legacy(_symbols))
+    offsets_time, positions = timeit(lambda: run_offsets(_symbols))
+    print(f"  {len(expected):7} pins  matrix {legacy_time * 1000:8.2f} ms  offsets {offsets_time * 1000:7.2f} ms"
+          f"  {legacy_time / offsets_time:4.1f}x  same: {positions == expected}")
@@ -0,0 +1,25 @@
+####################################################################################################
+#
+# Benchmark the sequential and the parallel project loaders
+#
+#   python examples/benchmarks/benchmark-project.py [project]
+#
+####################################################################################################
+
+from pathlib import Path
+import os
+import sys
+import time
+
+from KiCadRW.sexp.project import KiCadProject
+
+####################################################################################################
+
+project_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'kicad-examples/electrolab-cta-control-board')
+
+for max_workers in (1, 2, 4, os.cpu_count()):
+    start = time.perf_counter()
+    project = KiCadProject(project_path, max_workers=max_workers)
+    elapsed = time.perf_counter() - start
+    number_of_symbols = sum(1 for _ in project.symbols)
+    print(f"{max_workers:2} workers: {elapsed:.3f} s  {len(project)} sheets  {number_of_symbols} symbols")
@@ -0,0 +1,150 @@
+####################################################################################################
+#
+# Compare the former to_dict / fix_key_as_* conversion of the schematic items to the record extractor
+#
+#   python examples/benchmarks/benchmark-schema-read.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+from sexpdata import Symbol
+
+from KiCadRW.sexp import parser
+from KiCadRW.sexp.deprecated.sexpression import Sexpression
+from KiCadRW.sexp.extractor import tag_of
+from KiCadRW.sexp.schema import (
+    KiCadSchema,
+    LABEL_RECORD, LIB_SYMBOL_RECORD, POSITION_RECORD, SEGMENT_RECORD, SHEET_RECORD, SYMBOL_RECORD,
+)
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/ngspice-symbols/ngspice-symbols.kicad_sch'
+)
+
+####################################################################################################
+
+def legacy_lib_symbol(sexpr):
+    _, d = Sexpression.to_dict(sexpr)
+    Sexpression.fix_key_as_dict(d, 'property', 'properties')
+    Sexpression.fix_key_as_dict(d, 'symbol', 'symbols')
+    for _ in d['symbols'].values():
+        Sexpression.fix_key_as_list(_, 'polyline', 'polylines')
+        Sexpression.fix_key_as_list(_, 'pin', 'pins')
+    return d
+
+def legacy_symbol(sexpr):
+    _, d = Sexpression.to_dict(sexpr)
+    Sexpression.fix_key_as_dict(d, 'property', 'properties')
+    Sexpression.fix_key_as_dict(d, 'pin', 'pins')
+    return d
+
+def legacy_segment(sexpr):
+    _, d = Sexpression.to_dict(sexpr)
+    Sexpression.fix_key_as_list(d['pts'], 'xy', 'xys')
+    return d
+
+def legacy_sheet(sexpr):
+    _, d = Sexpression.to_dict(sexpr)
+    Sexpression.fix_key_as_list(d, 'property', 'properties')
+    return d
+
+def legacy_item(sexpr):
+    return Sexpression.to_dict(sexpr)[1]
+
+LEGACY = {
+    'junction': legacy_item,
+    'no_connect': legacy_item,
+    'bus_entry': legacy_item,
+    'wire': legacy_segment,
+    'bus': legacy_segment,
+    'label': legacy_item,
+    'global_label': legacy_item,
+    'hierarchical_label': legacy_item,
+    'symbol': legacy_symbol,
+    'sheet': legacy_sheet,
+}
+
+RECORDS = {
+    'junction': POSITION_RECORD,
+    'no_connect': POSITION_RECORD,
+    'bus_entry': POSITION_RECORD,
+    'wire': SEGMENT_RECORD,
+    'bus': SEGMENT_RECORD,
+    'label': LABEL_RECORD,
+    'global_label': LABEL_RECORD,
+    'hierarchical_label': LABEL_RECORD,
+    'symbol': SYMBOL_RECORD,
+    'sheet': SHEET_RECORD,
+}
+
+####################################################################################################
+
+def items(sexpr):
+    """Yield the items converted by KiCadSchema._read"""
+    for item in sexpr[1:]:
+        tag = tag_of(item)
+        if tag == 'lib_symbols':
+            for _ in item[1:]:
+                yield 'lib_symbol', _
+        elif tag in LEGACY:
+            yield tag, item
+
+def run_legacy(_items) -> int:
+    for tag, item in _items:
+        if tag == 'lib_symbol':
+            legacy_lib_symbol(item)
+        else:
+            LEGACY[tag](item)
+    return len(_items)
+
+def run_records(_items) -> int:
+    for tag, item in _items:
+        if tag == 'lib_symbol':
+            LIB_SYMBOL_RECORD.extract(item)
+        else:
+            RECORDS[tag].extract(item)
+    return len(_items)
+
+def timeit(function, repeat: int = 5) -> float:
+    """Return the best time of *repeat* runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def make_symbol(number_of_pins: int) -> list:
+    """Return a placed symbol having many pins and properties"""
+    sexpr = [Symbol('symbol'), [Symbol('lib_id'), 'Lib:Part'], [Symbol('at'), 10.16, 20.32, 0]]
+    for i in range(number_of_pins):
+        sexpr.append([Symbol('property'), f'Field{i}', 'value', [Symbol('id'), i], [Symbol('at'), 0, 0, 0]])
+    for i in range(number_of_pins):
+        sexpr.append([Symbol('pin'), str(i + 1), [Symbol('uuid'), Symbol(f'uuid-{i}')]])
+    return sexpr
+
+####################################################################################################
+
+print(path.name)
+sexpr = parser.load_path(path, lazy=KiCadSchema.LAZY_TAGS)
+_items = list(items(sexpr))
+legacy_time = timeit(lambda: run_legacy(_items))
+records_time = timeit(lambda: run_records(_items))
+print(f"  {len(_items)} items  to_dict {legacy_time * 1000:7.2f} ms  records {records_time * 1000:7.2f} ms"
+      f"  {legacy_time / records_time:4.1f}x")
+read_time = timeit(lambda: KiCadSchema(path, guess_netlist=False))
+print(f"  KiCadSchema load {read_time * 1000:7.2f} ms")
+
+print("symbol with n pins and n properties")
+for number_of_pins in (10, 100, 1000, 2000):
+    symbol = make_symbol(number_of_pins)
+    legacy_time = timeit(lambda: legacy_symbol(symbol), repeat=1)
+    records_time = timeit(lambda: SYMBOL_RECORD.extract(symbol), repeat=1)
+    print(f"  {number_of_pins:5}  to_dict {legacy_time * 1000:9.2f} ms  records {records_time * 1000:7.2f} ms")
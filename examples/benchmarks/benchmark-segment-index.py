@@ -0,0 +1,102 @@
+####################################################################################################
+#
+# Compare the segment index to the spatial hash, to the batch queries and to a scan of all the
+# wires, to find the wires passing through the junctions of T-junctions.  The segment index is used
+# to guess the netlist without NumPy, the batch queries are vectorised if NumPy is available.
+#
+#   python examples/benchmarks/benchmark-segment-index.py
+#
+####################################################################################################
+
+import random
+import time
+
+from KiCadRW import batch_geometry
+from KiCadRW.geometry import Position, SegmentIndex, SpatialHash, Vector
+
+####################################################################################################
+
+STEP = 2.54
+SCAN_MAX_WIRES = 5000
+
+####################################################################################################
+
+def synthetic_wires(number_of_rows: int) -> tuple[list, list]:
+    """Build horizontal buses of random lengths and vertical wires ending on them at a junction"""
+    random.seed(0)
+    wires = []
+    junctions = []
+    for row in range(number_of_rows):
+        y = row * 4 * STEP
+        x = 0
+        while x < 400 * STEP:
+            length = random.randint(1, 50) * STEP
+            wires.append((Position(x, y), Position(x + length, y)))
+            for _ in range(random.randint(0, 3)):
+                x_junction = x + random.randint(1, int(length / STEP)) * STEP
+                wires.append((Position(x_junction, y), Position(x_junction, y + 2 * STEP)))
+                junctions.append(Position(x_junction, y))
+            x += length
+    return wires, junctions
+
+def build(index_class, wires):
+    index = index_class()
+    for i, (start, end) in enumerate(wires):
+        index.insert_segment(i, start, end)
+    # the lines of SegmentIndex are sorted on the first query
+    index.query(Position(0, 0))
+    return index
+
+def run_index(index, wires, junctions) -> list:
+    return [
+        sorted(i for i in index.query(junction) if Vector.point_in_segment(*wires[i], junction))
+        for junction in junctions
+    ]
+
+def run_batch(wires, junctions) -> list:
+    """Build the grid and query it, like KiCadSchema._match_batch"""
+    starts = [(start.x, start.y) for start, end in wires]
+    ends = [(end.x, end.y) for start, end in wires]
+    points = [(_.x, _.y) for _ in junctions]
+    result = [[] for _ in junctions]
+    for i, j in batch_geometry.points_on_segments(points, starts, ends):
+        result[i].append(j)
+    return result
+
+def run_scan(wires, junctions) -> list:
+    return [
+        [i for i, (start, end) in enumerate(wires) if Vector.point_in_segment(start, end, junction)]
+        for junction in junctions
+    ]
+
+def timeit(function, repeat: int = 3) -> tuple[float, object]:
+    """Return the best time of *repeat* runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+####################################################################################################
+
+print(f"NumPy: {batch_geometry.HAS_NUMPY}")
+print(f"{'wires':>6} {'junctions':>9} {'scan':>9} {'hash build':>11} {'query':>9}"
+      f" {'index build':>12} {'query':>9} {'batch':>9}  same")
+for number_of_rows in (2, 8, 32, 128, 512):
+    wires, junctions = synthetic_wires(number_of_rows)
+    hash_build_time, spatial_hash = timeit(lambda: build(SpatialHash, wires))
+    hash_time, expected = timeit(lambda: run_index(spatial_hash, wires, junctions))
+    index_build_time, segment_index = timeit(lambda: build(SegmentIndex, wires))
+    index_time, result = timeit(lambda: run_index(segment_index, wires, junctions))
+    batch_time, batch_result = timeit(lambda: run_batch(wires, junctions))
+    same = result == expected == batch_result
+    if len(wires) <= SCAN_MAX_WIRES:
+        scan_time, reference = timeit(lambda: run_scan(wires, junctions), repeat=1)
+        same &= reference == expected
+        scan = f"{scan_time:8.3f}s"
+    else:
+        scan = f"{'-':>9}"
+    print(f"{len(wires):6} {len(junctions):9} {scan} {hash_build_time:10.4f}s {hash_time:8.4f}s"
+          f" {index_build_time:11.4f}s {index_time:8.4f}s {batch_time:8.4f}s  {same}")
@@ -0,0 +1,43 @@
+####################################################################################################
+#
+# Count the library symbols and pins of a project loaded with and without the symbol library pool
+#
+#   python examples/benchmarks/benchmark-symbol-pool.py [project]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+import tracemalloc
+
+from KiCadRW.sexp.project import KiCadProject
+from KiCadRW.sexp.schema import KiCadSchema, SymbolLibPool
+
+####################################################################################################
+
+project_path = Path(sys.argv[1] if len(sys.argv) > 1 else 'kicad-examples/electrolab-cta-control-board')
+
+####################################################################################################
+
+def load(pool):
+    KiCadSchema.SYMBOL_LIB_POOL = pool
+    tracemalloc.start()
+    start = time.perf_counter()
+    project = KiCadProject(project_path, max_workers=1)
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return project, elapsed, memory
+
+####################################################################################################
+
+for name, pool in (('no pool', None), ('pool', SymbolLibPool())):
+    project, elapsed, memory = load(pool)
+    symbol_libs = {id(_): _ for schema in project.schemas for _ in schema._symbol_libs.values()}
+    number_of_references = sum(len(schema._symbol_libs) for schema in project.schemas)
+    number_of_pins = sum(len(_._pins) for _ in symbol_libs.values())
+    print(f"{name:8} {elapsed:.3f} s  {memory / 2**20:5.1f} MB  {len(project)} sheets"
+          f"  {number_of_references} library symbols  {len(symbol_libs)} instances  {number_of_pins} pins")
+    if pool is not None:
+        print(f"         {pool.hits} hits  {pool.misses} misses")
@@ -0,0 +1,119 @@
+####################################################################################################
+#
+# Compare the former recursive traversals to the iterative traversals and generators, in elements/s
+#
+#   python examples/benchmarks/benchmark-traversal.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+from sexpdata import car, cdr, Symbol
+
+from KiCadRW.sexp import parser
+from KiCadRW.sexp.columnar import ColumnarTree
+from KiCadRW.sexp.objectifier import Node, Objectifier
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/open-syringe-pump/indus/opensyringepump_indus.kicad_sch'
+)
+
+####################################################################################################
+
+def legacy_walk(sexpr, parent=None):
+    """Former recursive Objectifier._walk_sexpr"""
+    if not isinstance(sexpr, list):
+        return sexpr
+    node = Node(str(car(sexpr)), parent)
+    for element in cdr(sexpr):
+        node.append_child(legacy_walk(element, node))
+    return node
+
+def legacy_depth_first_search(node, on_node=None, on_leaf=None, on_leave=None) -> None:
+    """Former recursive TreeMixin.depth_first_search"""
+    go = True
+    if on_node:
+        go = on_node(node)
+    if go:
+        for child in node:
+            if isinstance(child, Node):
+                legacy_depth_first_search(child, on_node, on_leaf, on_leave)
+            elif on_leaf:
+                on_leaf(child)
+        if on_leave:
+            on_leave(node)
+
+def timeit(function, repeat: int = 5) -> tuple[float, int]:
+    """Return the best time of *repeat* runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def nodes_with_callback(search) -> list:
+    nodes = []
+
+    def on_node(node):
+        nodes.append(node)
+        return True
+    search(on_node)
+    return nodes
+
+def leaves_with_callback(search) -> list:
+    leaves = []
+    search(lambda node: True, leaves.append)
+    return leaves
+
+def deep_sexpr(depth: int) -> list:
+    sexpr = [Symbol('leaf'), 1]
+    for _ in range(depth):
+        sexpr = [Symbol('node'), sexpr]
+    return sexpr
+
+####################################################################################################
+
+sexpr = parser.load_path(path)
+objectifier = Objectifier(path)
+root = objectifier.root
+tree = ColumnarTree.from_sexpr(sexpr)
+number_of_elements = len(tree)
+print(f"{path.name} {number_of_elements} elements")
+
+print(f"  {'':18} {'build':>9} {'nodes':>9} {'leaves':>9}  M elements/s")
+for name, build, _root, search in (
+        ('recursive', lambda: legacy_walk(sexpr), root,
+         lambda *args: legacy_depth_first_search(root, *args)),
+        ('iterative', lambda: objectifier._walk_sexpr(sexpr), root, root.depth_first_search),
+        ('generators', None, root, None),
+        ('columnar', lambda: ColumnarTree.from_sexpr(sexpr), tree.root, tree.root.depth_first_search),
+        ('columnar gen.', None, tree.root, None),
+):
+    if search is None:
+        functions = (lambda: list(_root.iter_nodes()), lambda: list(_root.iter_leaves()))
+    else:
+        functions = (lambda: nodes_with_callback(search), lambda: leaves_with_callback(search))
+    times = [timeit(build)[0] if build else None]
+    times += [timeit(_)[0] for _ in functions]
+    print(f"  {name:18}" + ''.join(
+        f" {'':>9}" if _ is None else f" {_ * 1000:6.2f} ms" for _ in times
+    ) + '  ' + ' '.join(
+        f"{'':>5}" if _ is None else f"{number_of_elements / _ / 1e6:5.2f}" for _ in times
+    ))
+
+depth = 10 * sys.getrecursionlimit()
+sexpr = deep_sexpr(depth)
+try:
+    legacy_walk(sexpr)
+    legacy = 'ok'
+except RecursionError:
+    legacy = 'RecursionError'
+node = objectifier._walk_sexpr(sexpr)
+print(f"  depth {depth}: recursive {legacy}, iterative {sum(1 for _ in node.iter_nodes())} nodes")
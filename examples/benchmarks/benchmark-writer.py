@@ -0,0 +1,94 @@
+####################################################################################################
+#
+# Benchmark the KiCad S-expression writer against the former re-indenting serializer
+#
+#   python examples/benchmarks/benchmark-writer.py [file.kicad_sym]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+import sexpdata
+from sexpdata import tosexp
+
+from KiCadRW.sexp import dumps, parser
+
+####################################################################################################
+
+path = Path(sys.argv[1] if len(sys.argv) > 1 else 'examples/avr_da_db/MCU_Microchip_AVR_Dx.kicad_sym')
+
+REPEAT = 5
+
+# Former formatting rules
+BREAK_OPENER_SYMBOLS = ('effects', 'fill', 'name', 'number', 'pin', 'property', 'rectangle', 'stroke', 'symbol')
+BREAK_CLOSER_SYMBOLS = ('kicad_symbol_lib', 'pin', 'property', 'rectangle', 'symbol')
+BREAK_PREFIX_SYMBOLS = ('kicad_symbol_lib',)
+
+####################################################################################################
+
+def legacy_tosexp(obj, **kwds):
+    """Former Delimiters serializer, each level re-indents the text of its childs"""
+    if hasattr(obj, '__to_lisp_as__'):
+        return legacy_tosexp(obj.__to_lisp_as__(), **kwds)
+    if isinstance(obj, (list, tuple)) and not isinstance(obj, sexpdata.Delimiters):
+        obj = sexpdata.Parens(obj)
+    if not isinstance(obj, sexpdata.Delimiters):
+        return tosexp(obj, **kwds)
+
+    exprs_indent = ''
+    break_prefix_opener = ''
+    break_prefix_closer = ''
+    suffix_break = ''
+    car = obj.I[0]
+    if isinstance(car, sexpdata.Symbol):
+        str_car = str(car)
+        kwds.setdefault('car_stack', [])
+        car_stack = kwds['car_stack']
+        dont_break = str_car == 'effects' and car_stack and car_stack[-1] in ('name', 'number')
+        if str_car in BREAK_OPENER_SYMBOLS and not dont_break:
+            exprs_indent = '  '
+            break_prefix_opener = '\n' + exprs_indent
+        if str_car in BREAK_CLOSER_SYMBOLS:
+            break_prefix_closer = '\n' + exprs_indent
+        kwds['car_stack'].append(str_car)
+        if str_car in BREAK_PREFIX_SYMBOLS:
+            suffix_break = '\n'
+
+    exprs = ' '.join(legacy_tosexp(x, **kwds) for x in obj.I)
+    indented_exprs = '\n'.join(exprs_indent + line.rstrip() for line in exprs.splitlines(True))
+    indented_exprs = indented_exprs[len(exprs_indent):]
+
+    if kwds.get('car_stack', None):
+        kwds['car_stack'].pop()
+
+    return (
+        break_prefix_opener + obj.opener + indented_exprs + break_prefix_closer + obj.closer + suffix_break
+    )
+
+####################################################################################################
+
+def timeit(function, sexpr):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        text = function(sexpr)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, text
+
+####################################################################################################
+
+text = path.read_text(encoding='utf8')
+size = len(text.encode('utf8')) / 2**20
+
+for backend in ('kicad', 'sexpdata'):
+    sexpr = parser.loads(text, backend)
+    legacy_time, legacy_text = timeit(legacy_tosexp, sexpr)
+    new_time, new_text = timeit(dumps, sexpr)
+    print(f"{path.name} {size*1024:.0f} kB, {backend} parser")
+    print(f"  legacy  {legacy_time*1000:8.1f} ms  {size/legacy_time:6.2f} MB/s")
+    print(f"  writer  {new_time*1000:8.1f} ms  {size/new_time:6.2f} MB/s  {legacy_time/new_time:.1f}x")
+    print(f"  identical to legacy: {new_text == legacy_text}, to file: {new_text == text}")
@@ -0,0 +1,127 @@
+####################################################################################################
+#
+# Compare the former depth first search xpath to the compiled xpath using the tag index, on the
+# loops of examples/test-objectifier.py, and a Python filter to a predicate.  Check the index steps.
+#
+#   python examples/benchmarks/benchmark-xpath.py [file.kicad_sch]
+#
+####################################################################################################
+
+from pathlib import Path
+import sys
+import time
+
+from KiCadRW.sexp.columnar import ColumnarTree
+from KiCadRW.sexp.objectifier import Objectifier
+
+####################################################################################################
+
+path = Path(
+    sys.argv[1] if len(sys.argv) > 1
+    else 'kicad-examples/open-syringe-pump/indus/opensyringepump_indus.kicad_sch'
+)
+
+####################################################################################################
+
+def legacy_xpath(self, path: str) -> list:
+    """Former implementation, a depth first search of the subtree"""
+    if path.startswith('/'):
+        path = path[1:]
+        index = 0
+    else:
+        index = -1
+    parts = path.split('/')
+    last_index = len(parts) - 1
+    results = []
+
+    def on_node(node):
+        nonlocal index
+        if index == -1:
+            index = 0
+            return True
+        if node.name == parts[index]:
+            if index == last_index:
+                results.append(node)
+                return False
+            index += 1
+            return True
+        return False
+
+    def on_leave(node):
+        nonlocal index
+        index -= 1
+    self.depth_first_search(on_node, on_leave=on_leave)
+    return results
+
+def run(root, xpath) -> int:
+    """Loops of examples/test-objectifier.py"""
+    count = len(xpath(root, '/kicad_sch/version'))
+    count += len(xpath(root, '/kicad_sch/lib_symbols/symbol'))
+    count += len(xpath(root, '/kicad_sch/symbol/lib_id'))
+    for node in xpath(root, '/kicad_sch/symbol'):
+        count += len(xpath(node, 'property'))
+    return count
+
+def timeit(function, repeat: int = 10) -> tuple[float, int]:
+    """Return the best time of *repeat* runs"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def all_paths(root) -> set[str]:
+    paths = set()
+
+    def on_node(node):
+        paths.add(node.path_str)
+        return True
+    root.depth_first_search(on_node)
+    return paths
+
+####################################################################################################
+
+print(path.name)
+root = Objectifier(path).root
+tree = ColumnarTree.from_path(path)
+
+# check the results for every path of the document
+same = True
+for path_str in all_paths(root):
+    expected = legacy_xpath(root, '/' + path_str)
+    same &= root.xpath('/' + path_str) == expected
+    same &= [_.path_str for _ in tree.root.xpath('/' + path_str)] == [_.path_str for _ in expected]
+print(f"  same results: {same}")
+
+# check the index steps, they select an atom of each node
+for name, _root in (('node', root), ('columnar', tree.root)):
+    expected = [_.childs[1] for _ in root.xpath('/kicad_sch/symbol/property')]
+    values = _root.xpath('/kicad_sch/symbol/property/1')
+    same = values == expected and _root.xpath('symbol/property/1') == expected
+    print(f"  {name:8} index step: {len(values)} atoms, same: {same}")
+
+for name, _root, xpath in (
+        ('legacy', root, legacy_xpath),
+        ('compiled', root, lambda node, path: node.xpath(path)),
+        ('columnar', tree.root, lambda node, path: node.xpath(path)),
+):
+    elapsed, count = timeit(lambda: run(_root, xpath))
+    print(f"  {name:8} {elapsed * 1000:8.2f} ms  {count} nodes")
+
+def python_filter(root) -> list:
+    """Symbols whose reference starts with U, filtered in Python"""
+    nodes = []
+    for node in root.xpath('/kicad_sch/symbol'):
+        for _ in node.xpath('property'):
+            childs = _.childs
+            if childs[0] == 'Reference' and childs[1].startswith('U'):
+                nodes.append(node)
+    return nodes
+
+for name, _root in (('node', root), ('columnar', tree.root)):
+    python_time, expected = timeit(lambda: python_filter(_root))
+    predicate_time, nodes = timeit(lambda: _root.xpath('/kicad_sch/symbol[property[0="Reference"]/1^="U"]'))
+    print(f"  {name:8} filter {python_time * 1000:6.2f} ms  predicate {predicate_time * 1000:6.2f} ms"
+          f"  {len(nodes)} nodes, same: {nodes == expected}")
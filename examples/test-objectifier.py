@@ -3,7 +3,7 @@
 from pathlib import Path
 from pprint import pprint
 
-from KiCadRW.sexp.objectifier import Objectifier, SchemaNode
+from KiCadRW.sexp.objectifier import Objectifier
 from KiCadRW.log import setup_logging
 
 ####################################################################################################
@@ -29,8 +29,7 @@ objectifier = Objectifier(schema_path)
 # objectifier.get_paths()
 
 # Dump nodes
-objectifier.get_schema()
-pprint(SchemaNode.NODES)
+pprint(objectifier.get_schema())
 
 if schema_path.suffix == '.kicad_sch':
     root = objectifier.root
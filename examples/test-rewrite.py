@@ -2,10 +2,9 @@
 
 from pathlib import Path
 from pprint import pprint
+import tempfile
 
-# https://sexpdata.readthedocs.io/en/latest/
-# https://github.com/jd-boyd/sexpdata
-import sexpdata
+from KiCadRW.sexp.document import Document
 
 ####################################################################################################
 
@@ -45,19 +44,14 @@ schema_path = Path(
 ####################################################################################################
 
 print(f"Load {schema_path}")
-with open(schema_path) as fh:
-    sexpr = sexpdata.load(fh)
-
-pprint(sexpr)
-
-new_schema_path = schema_path.name
-with open(new_schema_path, 'w') as fh:
-    # str_as ('symbol' or 'string') – How string should be interpreted. Default is 'string'.
-    # tuple_as ('list' or 'array') – How tuple should be interpreted. Default is 'list'.
-    # true_as (str) – How True should be interpreted. Default is 't'
-    # false_as (str) – How False should be interpreted. Default is '()'
-    # none_as (str) – How None should be interpreted. Default is '()'
-    sexpdata.dump(
-        sexpr, fh,
-    )
-    print(f'Write {new_schema_path}')
+document = Document.from_path(schema_path)
+
+pprint(document.root)
+
+# Unmodified subtrees are copied verbatim from the source
+assert document.dumps() == document.source.decode('utf8')
+
+# don't write in the current directory, e.g. the repository
+new_schema_path = Path(tempfile.gettempdir(), schema_path.name)
+document.save(new_schema_path)
+print(f'Write {new_schema_path}')